@@ -0,0 +1,119 @@
+"""CPU per stream of each audio pipeline, reading frames as fast as possible.
+
+Run from the repository root (needs ffmpeg, and libopus for the PCM paths):
+
+    python benchmarks/bench_audio_engine.py [--seconds 120] [--volume 0.5] [--opus-lib PATH]
+
+A test tone is rendered to a temporary Opus/WebM file (YouTube's usual audio
+format) and served over local HTTP with a YouTube-like `mime` parameter (the
+reconnect options only apply to network inputs), then played through:
+  * the old path: FFmpegPCMAudio + PCMVolumeTransformer, Opus-encoded in Python
+  * the 'pcm' engine: FFmpegPCMAudio + NumpyVolumeSource, Opus-encoded in Python
+  * the 'opus' engine: FFmpegOpusAudio with the volume in ffmpeg's filter graph
+CPU time is split between this process (what the voice thread would spend)
+and ffmpeg, and shown as the share of one core needed for a real-time stream.
+"""
+import argparse
+import functools
+import http.server
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import discord
+from discord.opus import Encoder
+from src.utils.youtube_dl import YTDLSource, ffmpeg_options
+from src.config.settings import FFMPEG_PATH
+
+FRAME_SECONDS = 0.02
+
+def render_tone(path, seconds):
+    subprocess.run(
+        [FFMPEG_PATH, '-nostdin', '-loglevel', 'error', '-f', 'lavfi',
+         '-i', f'sine=frequency=440:duration={seconds}', '-ac', '2', '-ar', '48000',
+         '-c:a', 'libopus', '-y', path],
+        check=True
+    )
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def serve(directory):
+    """Serve `directory` on a free local port from a daemon thread. Returns the server."""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def play(source, encoder):
+    """Read every frame like the voice client does. Returns (python cpu, ffmpeg cpu, frames)."""
+    python_started, ffmpeg_started = time.process_time(), children_cpu()
+    frames = 0
+    try:
+        while True:
+            data = source.read()
+            if not data:
+                break
+            if encoder is not None:
+                encoder.encode(data, Encoder.SAMPLES_PER_FRAME)
+            frames += 1
+    finally:
+        # cleanup espera a ffmpeg, así su CPU ya cuenta en RUSAGE_CHILDREN
+        source.cleanup()
+    return time.process_time() - python_started, children_cpu() - ffmpeg_started, frames
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU per stream of each audio pipeline")
+    parser.add_argument('--seconds', type=int, default=120, help="length of the test tone")
+    parser.add_argument('--volume', type=float, default=0.5)
+    parser.add_argument('--opus-lib', help="libopus to load when it is not on the linker path")
+    args = parser.parse_args()
+
+    if not shutil.which(FFMPEG_PATH):
+        sys.exit(f"ffmpeg not found ({FFMPEG_PATH}); set FFMPEG_PATH")
+
+    encoder = None
+    if args.opus_lib:
+        discord.opus.load_opus(args.opus_lib)
+    if discord.opus.is_loaded() or discord.opus._load_default():
+        encoder = Encoder()
+    else:
+        print("libopus not found: the PCM paths are measured without Opus encoding\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tone.webm')
+        render_tone(path, args.seconds)
+        server = serve(directory)
+        url = f"http://127.0.0.1:{server.server_port}/tone.webm?mime=audio%2Fwebm"
+
+        pipelines = {
+            'old (PCMVolumeTransformer)': lambda: discord.PCMVolumeTransformer(
+                discord.FFmpegPCMAudio(url, **ffmpeg_options), volume=args.volume),
+            "engine='pcm'": lambda: YTDLSource.create_source(url, volume=args.volume, engine='pcm'),
+            "engine='opus'": lambda: YTDLSource.create_source(url, volume=args.volume, engine='opus'),
+        }
+
+        print(f"{args.seconds} s of audio at volume {args.volume}")
+        print(f"  {'pipeline':<28} {'python':>9} {'ffmpeg':>9} {'total':>9}   (% of one core per stream)")
+        for label, build in pipelines.items():
+            source = build()
+            python_cpu, ffmpeg_cpu, frames = play(source, None if source.is_opus() else encoder)
+            audio_seconds = frames * FRAME_SECONDS or 1
+            print(f"  {label:<28} {python_cpu / audio_seconds * 100:>8.2f}% {ffmpeg_cpu / audio_seconds * 100:>8.2f}% "
+                  f"{(python_cpu + ffmpeg_cpu) / audio_seconds * 100:>8.2f}%")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
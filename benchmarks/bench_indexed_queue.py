@@ -0,0 +1,63 @@
+"""Micro-benchmarks of the queue backend: plain list (before) vs IndexedQueue.
+
+Run from the repository root:
+
+    python benchmarks/bench_indexed_queue.py [--sizes 10000 100000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.indexed_queue import IndexedQueue
+
+PAGE_SIZE = 10
+
+# backend -> (build, pop front, pop middle, page of PAGE_SIZE from the middle)
+BACKENDS = {
+    'list': (
+        'list(range(size))',
+        'queue.pop(0)',
+        'queue.pop(mid)',
+        'queue[mid:mid + PAGE_SIZE]',
+    ),
+    'IndexedQueue': (
+        'IndexedQueue(range(size))',
+        'queue.popleft()',
+        'queue.pop(mid)',
+        'list(queue.iter_range(mid, mid + PAGE_SIZE))',
+    ),
+}
+
+def best_of(stmt, env, number):
+    """Best time per operation, in seconds."""
+    return min(timeit.repeat(stmt, globals=env, number=number, repeat=5)) / number
+
+def run(size, number):
+    print(f"\n{size} entries")
+    for name, (build, pop_front, pop_middle, page) in BACKENDS.items():
+        env = {'IndexedQueue': IndexedQueue, 'size': size, 'mid': size // 2, 'PAGE_SIZE': PAGE_SIZE}
+        print(f"  {name}")
+        print(f"    {'build':<30} {best_of(build, env, 3) * 1e3:>10.2f} ms")
+
+        env['queue'] = eval(build, env)
+        # Lo que se quita se vuelve a añadir, así la cola mantiene su tamaño
+        for label, stmt in (
+            ('pop front + append', f'queue.append({pop_front})'),
+            ('pop middle + insert middle', f'queue.insert(mid, {pop_middle})'),
+            (f'page of {PAGE_SIZE} from the middle', page),
+        ):
+            print(f"    {label:<30} {best_of(stmt, env, number) * 1e6:>10.2f} µs/op")
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue backend micro-benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--number', type=int, default=2000, help="operations per timing")
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.number)
+
+if __name__ == '__main__':
+    main()
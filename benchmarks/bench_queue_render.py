@@ -0,0 +1,108 @@
+"""Rendering a page of a big queue: the old fz!queue code vs EmbedCreator.
+
+Run from the repository root:
+
+    python benchmarks/bench_queue_render.py [--size 10000] [--page 500]
+
+The new code is timed twice: rendering right after the queue changed (a
+song added and removed, which invalidates its cached pages) and rendering
+a page that is still cached.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import discord
+from src.utils.embed_creator import EmbedCreator
+from src.utils.music_queue import MusicQueue, Song
+
+SONGS_PER_PAGE = 10
+
+class FakeMember:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.display_name = f"user{user_id}"
+
+class FakeGuild:
+    def __init__(self, members):
+        self._members = {member.id: member for member in members}
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+class OldSong:
+    def __init__(self, title, duration, requester):
+        self.title = title
+        self.duration = duration
+        self.requester = requester
+
+def old_render(queue, current, page):
+    """The body of Music.queue_cmd before embeds were cached (list-based queue)."""
+    display_queue = []
+    if current:
+        display_queue.append({"position": 0, "song": current, "current": True})
+    for i, song in enumerate(queue):
+        display_queue.append({"position": i + 1, "song": song, "current": False})
+
+    page_idx = max(0, page - 1)
+    embed = discord.Embed(title="🎵 Cola de reproducción", color=0x9B59B6)
+    pages = (len(display_queue) + SONGS_PER_PAGE - 1) // SONGS_PER_PAGE
+    if page_idx >= pages:
+        page_idx = 0
+    start = page_idx * SONGS_PER_PAGE
+    end = min(start + SONGS_PER_PAGE, len(display_queue))
+
+    description = ""
+    for item in display_queue[start:end]:
+        song = item["song"]
+        if item["current"]:
+            description += f"**🔊 Ahora:** {song.title} [{song.duration}] (pedida por {song.requester.display_name})\n\n"
+        else:
+            description += f"**{item['position']}.** {song.title} [{song.duration}] (pedida por {song.requester.display_name})\n\n"
+    embed.description = description
+    embed.set_footer(text=f"Página {page_idx + 1} de {pages} | {len(display_queue)} canción(es) en total")
+    return embed
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue page rendering")
+    parser.add_argument('--size', type=int, default=10_000)
+    parser.add_argument('--page', type=int, default=500, help="1-based page to render")
+    parser.add_argument('--number', type=int, default=200, help="renders per timing")
+    args = parser.parse_args()
+
+    members = [FakeMember(1000 + i) for i in range(20)]
+    guild = FakeGuild(members)
+
+    # El código antiguo guardaba la duración ya formateada
+    old_queue = [OldSong(f"Song {i}", EmbedCreator.format_time(200 + i % 100), members[i % 20]) for i in range(args.size)]
+    old_current = old_queue.pop(0)
+
+    queue = MusicQueue(None, guild_id=1)
+    for i in range(args.size):
+        queue.add(Song(f"Song {i}", 200 + i % 100, f"https://www.youtube.com/watch?v={i:011d}", None, members[i % 20].id))
+    queue.current = queue.get_next()
+    page_idx = args.page - 1
+    extra = Song("Extra", 180, "https://www.youtube.com/watch?v=xxxxxxxxxxx", None, members[0].id)
+
+    def new_after_change():
+        # Cada cambio sube la versión de la cola e invalida sus páginas
+        queue.add(extra)
+        queue.remove(len(queue) - 1)
+        return EmbedCreator.create_queue_page_embed(queue, page_idx, guild, SONGS_PER_PAGE)
+
+    cases = {
+        'old queue_cmd': lambda: old_render(old_queue, old_current, args.page),
+        'EmbedCreator, after a change': new_after_change,
+        'EmbedCreator, cached page': lambda: EmbedCreator.create_queue_page_embed(queue, page_idx, guild, SONGS_PER_PAGE),
+    }
+
+    print(f"{args.size} songs, page {args.page}")
+    for label, render in cases.items():
+        best = min(timeit.repeat(render, number=args.number, repeat=5)) / args.number
+        print(f"  {label:<30} {best * 1e6:>10.1f} µs/render")
+
+if __name__ == '__main__':
+    main()
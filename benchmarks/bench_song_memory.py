@@ -0,0 +1,95 @@
+"""Memory per queued track: the old Song (plain object) vs the slotted Song.
+
+Run from the repository root:
+
+    python benchmarks/bench_song_memory.py [--count 10000]
+
+The old Song also held its ffmpeg source from the moment it was queued; that
+is left out here (source=None). The slotted Song is measured with and without
+the signed stream URL (about 1 KB) that `resolve_song` stores; songs queued
+from a playlist only get it when the prefetcher resolves them.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.music_queue import Song
+from src.utils.youtube_dl import YTDLSource
+
+class OldSong:
+    """Song as it was before: full URLs, formatted duration and the Member object."""
+    def __init__(self, source, title, duration, url, thumbnail, requester):
+        self.source = source
+        self.title = title
+        self.duration = duration
+        self.url = url
+        self.thumbnail = thumbnail
+        self.requester = requester
+
+class FakeMember:
+    """Stands in for discord.Member, shared by every song like the real one."""
+    def __init__(self, user_id):
+        self.id = user_id
+        self.display_name = f"user{user_id}"
+
+MEMBERS = [FakeMember(1000 + i) for i in range(20)]
+
+def track_data(i):
+    """Fields of a yt-dlp info dict; only what the song keeps stays alive."""
+    video_id = f"{i:011d}"[-11:]
+    return {
+        'title': f"Artist {i % 500} - Song title number {i}",
+        'duration': 120 + i % 300,
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+        'thumbnail': f"https://i.ytimg.com/vi/{video_id}/maxresdefault.jpg?sqp=-oaymwEmCIAKENAF8quKqQMa8AEB",
+        'requester': MEMBERS[i % len(MEMBERS)],
+        'stream_url': stream_url(video_id, i),
+    }
+
+def stream_url(video_id, i):
+    """A signed googlevideo URL of realistic length (~1 KB)."""
+    signature = f"{i:040x}" * 4
+    return (
+        f"https://rr{i % 8 + 1}---sn-h5q7knes.googlevideo.com/videoplayback?expire={1760000000 + i}"
+        f"&ei=AbCdEfGhIjKlMnOpQrStUv&ip=203.0.113.{i % 250}&id=o-{video_id}{signature[:32]}"
+        f"&itag=251&source=youtube&requiressl=yes&xpc=EgVo2aDSNQ%3D%3D&mh=Ab&mm=31%2C29&mn=sn-h5q7knes%2Csn-h5qzen7s"
+        f"&ms=au%2Crdu&mv=m&mvi=1&pl=24&initcwndbps=1234567&vprv=1&svpuc=1&mime=audio%2Fwebm&gir=yes"
+        f"&clen={3000000 + i}&dur={120 + i % 300}.001&lmt=1700000000000000&mt=1760000000&fvip=4&keepalive=yes"
+        f"&c=ANDROID_VR&txp=4532434&sparams=expire%2Cei%2Cip%2Cid%2Citag%2Csource%2Crequiressl%2Cxpc%2Cvprv%2Csvpuc%2Cmime%2Cgir%2Cclen%2Cdur%2Clmt"
+        f"&sig={signature}&lsparams=mh%2Cmm%2Cmn%2Cms%2Cmv%2Cmvi%2Cpl%2Cinitcwndbps&lsig={signature[:96]}"
+    )
+
+def measure(build, count):
+    """Bytes still allocated per song once the extracted data is gone."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    songs = [build(track_data(i)) for i in range(count)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Restar la lista que guarda las canciones
+    return (after - before - sys.getsizeof(songs)) / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per queued track")
+    parser.add_argument('--count', type=int, default=10_000)
+    args = parser.parse_args()
+
+    old = measure(lambda t: OldSong(None, t['title'], YTDLSource.parse_duration(t['duration']), t['url'],
+                                    t['thumbnail'], t['requester']), args.count)
+    new = measure(lambda t: Song(t['title'], t['duration'], t['url'], t['thumbnail'], t['requester'].id), args.count)
+    resolved = measure(lambda t: Song(t['title'], t['duration'], t['url'], t['thumbnail'], t['requester'].id,
+                                      stream_url=t['stream_url']), args.count)
+
+    print(f"{args.count} tracks")
+    print(f"  old Song (without its source)    {old:>8.0f} bytes/track")
+    print(f"  slotted Song, no stream URL      {new:>8.0f} bytes/track ({(1 - new / old) * 100:.0f}% less)")
+    print(f"  slotted Song, with stream URL    {resolved:>8.0f} bytes/track")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Per-extraction overhead: a new YoutubeDL per call (before) vs the YTDLPool.
+
+Run from the repository root:
+
+    python benchmarks/bench_ytdl_pool.py [--runs 50] [--url https://www.youtube.com/watch?v=...]
+
+Without --url only the cost of getting a YoutubeDL instance is measured,
+which needs no network. With --url every run also extracts that video, so
+the timings include the HTTP connections the pooled instances keep open.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import yt_dlp
+from src.utils.youtube_dl import ytdl_format_options
+from src.utils.ytdl_pool import YTDLPool
+
+def fresh_call(url):
+    instance = yt_dlp.YoutubeDL(ytdl_format_options)
+    if url:
+        instance.extract_info(url, download=False)
+
+def pooled_call(pool, url):
+    with pool.checkout('track') as instance:
+        if url:
+            instance.extract_info(url, download=False)
+
+def measure(call, runs):
+    """Return (median seconds, median allocated bytes) per call."""
+    call()  # Calentar cachés de importación y, con el pool, su instancia
+    times = []
+    allocations = []
+    for _ in range(runs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+        # Pico de memoria reservada durante la llamada
+        allocations.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(times), statistics.median(allocations)
+
+def main():
+    parser = argparse.ArgumentParser(description="YoutubeDL pool overhead")
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--url', help="video to extract on every run (needs network)")
+    args = parser.parse_args()
+
+    pool = YTDLPool({'track': ytdl_format_options}, size=1)
+    results = {
+        'new YoutubeDL per call': measure(lambda: fresh_call(args.url), args.runs),
+        'pooled YoutubeDL': measure(lambda: pooled_call(pool, args.url), args.runs),
+    }
+
+    print(f"{args.runs} runs, {'extracting ' + args.url if args.url else 'instance setup only'}")
+    for label, (seconds, allocated) in results.items():
+        print(f"  {label:<24} {seconds * 1e3:>9.2f} ms/call {allocated / 1024:>10.1f} KiB peak allocated")
+
+if __name__ == '__main__':
+    main()
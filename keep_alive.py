@@ -1,15 +1,92 @@
-from flask import Flask
-from threading import Thread
+import math
+import discord
+from aiohttp import web
+from src.config.settings import KEEP_ALIVE_HOST, KEEP_ALIVE_PORT
+from src.utils.metrics import metrics
 
-app = Flask('')
+def _socket_ready(ws):
+    # latency vale inf hasta el primer heartbeat ACK de la conexión actual
+    return ws is not None and ws.open and math.isfinite(ws.latency)
 
-@app.route('/')
-def home():
-    return "¡FzMusic Bot está en línea!"
+def gateway_status(bot):
+    """Return {shard_id: connected} from the live gateway websockets.
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+    `bot.is_ready()` stays true through reconnects, so it only tells whether
+    the first READY arrived; the websocket of each shard must also be open and
+    have acknowledged a heartbeat.
+    """
+    if not bot.is_ready() or bot.is_closed():
+        return {}
+    if isinstance(bot, discord.AutoShardedClient):
+        return {shard_id: not shard.is_closed() and math.isfinite(shard.latency)
+                for shard_id, shard in bot.shards.items()}
+    return {0: _socket_ready(bot.ws)}
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
\ No newline at end of file
+def create_app(bot):
+    """Build the health/status web app. It runs on the bot's own event loop."""
+    app = web.Application()
+
+    async def home(request):
+        return web.Response(text="¡FzMusic Bot está en línea!")
+
+    async def healthz(request):
+        # Listo = todos los shards conectados al gateway y el cog de música cargado
+        shards = gateway_status(bot)
+        checks = {
+            'gateway': bool(shards) and all(shards.values()),
+            'music_cog': bot.get_cog('Music') is not None,
+        }
+        ready = all(checks.values())
+        return web.json_response({'ready': ready, **checks, 'shards': {str(k): v for k, v in shards.items()}},
+                                 status=200 if ready else 503)
+
+    async def status(request):
+        cog = bot.get_cog('Music')
+        guilds = []
+        if cog is not None:
+            # Mismo hilo que el bot, así que el estado se lee directamente
+            state = cog.guild_music_state
+            for guild_id, queue in state.queues.items():
+                guild = bot.get_guild(guild_id)
+                voice_client = guild.voice_client if guild else None
+                player = state.players.get(guild_id)
+                current = queue.current
+                guilds.append({
+                    'guild_id': guild_id,
+                    'connected': bool(voice_client and voice_client.is_connected()),
+                    'playing': bool(voice_client and voice_client.is_playing()),
+                    'paused': bool(voice_client and voice_client.is_paused()),
+                    'current': {
+                        'title': current.title,
+                        'url': current.url,
+                        'duration': current.duration,
+                        'position': round(player.position, 1) if player else 0,
+                    } if current else None,
+                    'queued': len(queue),
+                    'queued_duration': queue.total_duration,
+                    'volume': queue.volume,
+                })
+        return web.json_response({'guilds': guilds})
+
+    async def prometheus_metrics(request):
+        if not metrics.enabled:
+            return web.Response(text="Metrics are disabled (set METRICS_ENABLED=true)\n", status=404)
+        return web.Response(body=metrics.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    app.router.add_get('/', home)
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/status', status)
+    app.router.add_get('/metrics', prometheus_metrics)
+    return app
+
+async def keep_alive(bot, port=KEEP_ALIVE_PORT):
+    """Start the web server on the running loop. Returns the runner to clean it up.
+
+    Shard worker processes each pass their own `port`, so every health check,
+    status and metrics request reaches the worker it is meant for.
+    """
+    runner = web.AppRunner(create_app(bot), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, KEEP_ALIVE_HOST, port)
+    await site.start()
+    return runner
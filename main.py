@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 import os
+import sys
 import logging
 import asyncio
 from dotenv import load_dotenv
@@ -9,6 +10,9 @@ from keep_alive import keep_alive
 # Add the project root to Python path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + '/..'))
 
+from src.config.settings import KEEP_ALIVE_PORT, SHARD_MODE, SHARD_COUNT, SHARD_PROCESSES, SHARD_RESTART_DELAY
+from src.utils.shard_supervisor import ShardSupervisor, fetch_recommended_shards
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,34 +26,60 @@ logging.basicConfig(
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-# Set up intents for the bot
-intents = discord.Intents.default()
-intents.message_content = True
-intents.voice_states = True
+def create_bot(shard_ids=None, shard_count=None):
+    """Create the bot, sharded unless SHARD_MODE is 'single'."""
+    # Set up intents for the bot
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.voice_states = True
+
+    # Initialize the bot with a command prefix and intents
+    if SHARD_MODE == 'single':
+        bot = commands.Bot(command_prefix='fz!', intents=intents, help_command=None)
+    else:
+        bot = commands.AutoShardedBot(
+            command_prefix='fz!', intents=intents, help_command=None,
+            shard_ids=shard_ids, shard_count=shard_count or SHARD_COUNT
+        )
 
-# Initialize the bot with a command prefix and intents
-bot = commands.Bot(command_prefix='fz!', intents=intents, help_command=None)
+    @bot.event
+    async def on_ready():
+        print(f'Logged in as {bot.user} (ID: {bot.user.id})')
+        if bot.shard_count:
+            print(f'Shards: {sorted(bot.shards)} of {bot.shard_count}')
+        print('------')
 
-async def load_extensions():
+    return bot
+
+async def load_extensions(bot):
     try:
         await bot.load_extension("src.cogs.music")
         print("Loaded music extension")
     except Exception as e:
         print(f"Failed to load extension: {e}")
 
-@bot.event
-async def on_ready():
-    print(f'Logged in as {bot.user} (ID: {bot.user.id})')
-    print('------')
-
-# Keep the bot running on Replit
-keep_alive()
-
 # Run the bot
-async def main():
+async def main(shard_ids=None, shard_count=None, port=KEEP_ALIVE_PORT):
+    bot = create_bot(shard_ids, shard_count)
     async with bot:
-        await load_extensions()
-        await bot.start(TOKEN)
+        await load_extensions(bot)
+        # Keep the bot running on Replit; the web server shares the bot's event loop
+        runner = await keep_alive(bot, port)
+        try:
+            await bot.start(TOKEN)
+        finally:
+            await runner.cleanup()
+
+def run_shard_worker(shard_ids, shard_count, index):
+    """Entry point of a worker process in SHARD_MODE=processes.
+
+    Worker `index` serves its web endpoints on KEEP_ALIVE_PORT + index.
+    """
+    asyncio.run(main(shard_ids, shard_count, KEEP_ALIVE_PORT + index))
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if SHARD_MODE == 'processes':
+        shard_count = SHARD_COUNT or fetch_recommended_shards(TOKEN)
+        ShardSupervisor(run_shard_worker, shard_count, SHARD_PROCESSES, restart_delay=SHARD_RESTART_DELAY).run()
+    else:
+        asyncio.run(main())
@@ -2,10 +2,10 @@ import asyncio
 import discord
 import logging
 import re
-import datetime
-from discord.ext import commands, tasks
+from discord.ext import commands
 from ..utils.music_queue import GuildMusicState, Song
 from ..utils.youtube_dl import YTDLSource
+from ..utils.extraction_cache import extract_video_id
 from ..utils.embed_creator import EmbedCreator
 
 logger = logging.getLogger('music')
@@ -16,28 +16,18 @@ class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.guild_music_state = GuildMusicState(bot)
-        self.check_inactivity.start()
-        self.song_finished_flags = {}  # Diccionario para rastrear canciones finalizadas
-        self.command_channels = {}  # Nuevo diccionario para rastrear los canales de comando
-        self.process_finished_songs.start()
     
     def cog_unload(self):
-        self.check_inactivity.cancel()
-        self.process_finished_songs.cancel()
+        self.guild_music_state.close()
     
-    @tasks.loop(minutes=1)
-    async def check_inactivity(self):
-        """Task to check for voice client inactivity."""
-        await self.guild_music_state.check_inactivity()
-    
-    @check_inactivity.before_loop
-    async def before_check_inactivity(self):
-        await self.bot.wait_until_ready()
+    def send(self, ctx, content=None, *, embed=None, **kwargs):
+        """Queue a message for the command's channel through the rate-limited dispatcher."""
+        return self.guild_music_state.dispatcher.send(ctx.channel, content, embed=embed, **kwargs)
     
     async def join_voice_channel(self, ctx):
         """Join the user's voice channel."""
         if ctx.author.voice is None:
-            await ctx.send("You need to be in a voice channel to use this command.")
+            await self.send(ctx, "You need to be in a voice channel to use this command.")
             return False
         
         voice_channel = ctx.author.voice.channel
@@ -52,105 +42,44 @@ class Music(commands.Cog):
         
         return True
     
-    async def play_next(self, ctx):
-        """Play the next song in the queue."""
-        # Verificar si el cliente de voz sigue conectado
-        if not ctx.voice_client or not ctx.voice_client.is_connected():
-            logger.info("Voice client disconnected, not playing next song")
-            return
-        
-        # Verificar si ya está reproduciendo algo (evitar reproducción simultánea)
-        if ctx.voice_client.is_playing():
-            logger.info("Already playing something, not starting a new song")
-            return
-        
+    async def resolve_song(self, ctx, query, requester):
+        """Extract a URL or search term into a Song. Returns None if nothing was found."""
+        # Los términos de búsqueda pasan por el resolvedor de búsquedas (con caché)
+        url = query if query.startswith(('http://', 'https://')) else f"ytsearch:{query}"
         queue = self.guild_music_state.get_queue(ctx.guild.id)
-        queue.update_activity()
+        sources = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True, volume=queue.volume, guild_id=ctx.guild.id)
         
-        # Guardar la canción actual para comparar después
-        old_song = queue.current
-        
-        # La canción actual ya se reprodujo, así que obtenemos la siguiente
-        song = queue.get_next()
-        
-        # Si no hay más canciones en la cola, desconectamos
-        if not song:
-            await ctx.send("Queue is empty. Stopping playback.")
-            # Limpiar referencias antes de desconectar
-            queue.current = None
-            
-            # Limpiar el canal de comando
-            if ctx.guild.id in self.command_channels:
-                del self.command_channels[ctx.guild.id]
-            
-            try:
-                if ctx.voice_client and ctx.voice_client.is_connected():
-                    await ctx.voice_client.disconnect()
-            except Exception as e:
-                logger.error(f"Error disconnecting: {e}")
-            return
-        
-        # Actualizar la canción actual a la nueva canción
-        queue.current = song
-        
-        # Verificar nuevamente si el cliente de voz sigue conectado
-        if not ctx.voice_client or not ctx.voice_client.is_connected():
-            logger.info("Voice client disconnected before playing")
-            return
+        if not sources or len(sources) == 0:
+            return None
         
-        try:
-            # Reproducir la canción actual
-            if queue.current and queue.current.source:
-                # Usar nuestro nuevo sistema de flags
-                ctx.voice_client.play(
-                    discord.PCMVolumeTransformer(queue.current.source, volume=queue.volume),
-                    after=lambda _: self.bot.loop.call_soon_threadsafe(self.set_song_finished, ctx.guild.id)
-                )
-                
-                # Solo enviar el embed si la canción cambió
-                if old_song != queue.current:
-                    embed = EmbedCreator.create_now_playing_embed(queue.current)
-                    await ctx.send(embed=embed)
-            else:
-                logger.error("Error: Current song or source is None")
-                await ctx.send("Error playing the current song. Skipping...")
-        except Exception as e:
-            logger.error(f"Error playing song: {e}")
-    
-    async def handle_song_complete(self, error, ctx):
-        """Este método ya no se utiliza."""
-        pass
+        source_data = sources[0]
+        return Song(
+            title=source_data['data'].get('title', 'Unknown Title'),
+            duration=source_data['data'].get('duration'),
+            url=source_data['data'].get('webpage_url', url),
+            thumbnail=source_data['data'].get('thumbnail'),
+            requester_id=requester.id,
+            stream_url=source_data['stream_url']
+        )
     
     async def process_song(self, ctx, url, requester):
-        """Process a song URL and add to queue."""
+        """Process a song URL or search term and add to queue."""
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
         async with ctx.typing():
             try:
-                # Procesar la canción independientemente de si es una URL o una búsqueda
-                sources = await YTDLSource.from_url(url, loop=self.bot.loop, stream=True, volume=queue.volume)
-                
-                if not sources or len(sources) == 0:
+                song = await self.resolve_song(ctx, url, requester)
+                if song is None:
                     return "Couldn't extract any audio from that URL or search term."
                 
-                # Process the song
-                source_data = sources[0]
-                song = Song(
-                    source=source_data['source'],
-                    title=source_data['data'].get('title', 'Unknown Title'),
-                    duration=YTDLSource.parse_duration(source_data['data'].get('duration')),
-                    url=source_data['data'].get('webpage_url', url),
-                    thumbnail=source_data['data'].get('thumbnail'),
-                    requester=requester
-                )
-                
-                # Add to queue
-                queue.add(song)
-                
-                # Start playing if not already playing
-                if not ctx.voice_client.is_playing():
-                    await self.play_next(ctx)
+                # Add to queue, starting playback if nothing is playing
+                player = self.guild_music_state.get_player(ctx.guild.id)
+                started = await player.submit('enqueue', [song], ctx.channel)
+                if started is None:
+                    # El reproductor se cerró (desconexión) antes de recibir la canción
+                    return f"Couldn't add **{song.title}**: the bot was disconnecting. Try again."
+                if started:
                     return None
                 
                 return f"Added **{song.title}** to the queue."
@@ -159,57 +88,125 @@ class Music(commands.Cog):
                 logger.error(f"Error processing song: {e}")
                 return f"An error occurred: {e}"
     
+    async def process_songs(self, ctx, queries, requester):
+        """Resolve several URLs or search terms concurrently and queue them in order."""
+        queue = self.guild_music_state.get_queue(ctx.guild.id)
+        queue.update_activity()
+        
+        async with ctx.typing():
+            results = await asyncio.gather(
+                *(self.resolve_song(ctx, query, requester) for query in queries),
+                return_exceptions=True
+            )
+        
+        songs = []
+        failed = []
+        for query, result in zip(queries, results):
+            if isinstance(result, Song):
+                songs.append(result)
+            else:
+                if isinstance(result, Exception):
+                    logger.error(f"Error processing song {query}: {result}")
+                failed.append(query)
+        
+        if not songs:
+            return "Couldn't extract any audio from those URLs or search terms."
+        
+        if await self.guild_music_state.get_player(ctx.guild.id).submit('enqueue', songs, ctx.channel) is None:
+            return "Couldn't add the songs: the bot was disconnecting. Try again."
+        result = f"**{len(songs)}** canciones añadidas a la cola."
+        if failed:
+            result += "\nNo se encontró: " + ", ".join(f"`{query}`" for query in failed)
+        return result
+    
+    async def process_playlist(self, ctx, url, requester):
+        """Stream a playlist into the queue, starting playback with its first entry."""
+        queue = self.guild_music_state.get_queue(ctx.guild.id)
+        queue.update_activity()
+        
+        added = 0
+        # Un único mensaje de progreso que se va editando
+        progress_key = ('playlist', ctx.message.id)
+        try:
+            async for batch in YTDLSource.iter_playlist(url, guild_id=ctx.guild.id):
+                # Parar si el bot se desconectó mientras se leía la playlist
+                if self.guild_music_state.queues.get(ctx.guild.id) is not queue or not ctx.voice_client:
+                    return None
+                
+                songs = []
+                for entry in batch:
+                    thumbnails = entry.get('thumbnails') or []
+                    songs.append(Song(
+                        title=entry.get('title') or 'Unknown Title',
+                        duration=entry.get('duration'),
+                        url=YTDLSource.entry_url(entry),
+                        thumbnail=entry.get('thumbnail') or (thumbnails[-1].get('url') if thumbnails else None),
+                        requester_id=requester.id
+                    ))
+                # El reproductor empieza a sonar en cuanto llega la primera canción
+                if await self.guild_music_state.get_player(ctx.guild.id).submit('enqueue', songs, ctx.channel) is None:
+                    return None
+                added += len(songs)
+                
+                # Las actualizaciones que aún no se enviaron se sustituyen por la última
+                embed = EmbedCreator.create_basic_embed("📃 Cargando playlist...", f"**{added}** canciones añadidas a la cola.")
+                self.send(ctx, embed=embed, key=progress_key, edit='always')
+        except Exception as e:
+            logger.error(f"Error processing playlist: {e}")
+            if not added and not extract_video_id(url):
+                return f"An error occurred: {e}"
+        
+        if not added:
+            # Enlaces como youtu.be/<id>?list=... siguen siendo un vídeo aunque la lista no dé nada
+            video_id = extract_video_id(url)
+            if video_id:
+                return await self.process_song(ctx, f"https://www.youtube.com/watch?v={video_id}", requester)
+            return "Couldn't extract any songs from that playlist."
+        
+        embed = EmbedCreator.create_basic_embed("✅ Playlist añadida", f"**{added}** canciones añadidas a la cola.")
+        await self.send(ctx, embed=embed, key=progress_key, edit='always')
+        return None
+    
     @commands.command(name="play", aliases=["p"])
     async def play(self, ctx, *, url):
-        """Play a song from a YouTube URL."""
-        # Verificar que es una URL válida
-        if not url.startswith(('http://', 'https://')):
-            await ctx.send("❌ Solo se aceptan URLs directas. Usa `fz!p https://www.youtube.com/watch?v=...`")
+        """Play a song from a YouTube URL or search term (several separated by `|`)."""
+        queries = [query.strip() for query in url.split('|') if query.strip()]
+        if not queries:
+            await self.send(ctx, "❌ Usa `fz!p <URL o búsqueda>` o varias separadas por `|`.")
             return
         
-        # Guardar el canal desde donde se ejecutó el comando
-        self.command_channels[ctx.guild.id] = ctx.channel.id
-        
         # Asegurarnos de que el bot está en un canal de voz
         if not await self.join_voice_channel(ctx):
             return
         
-        # Procesar la canción
-        result = await self.process_song(ctx, url, ctx.author)
+        # Procesar la playlist, la canción o varias canciones a la vez
+        if len(queries) > 1:
+            result = await self.process_songs(ctx, queries, ctx.author)
+        elif YTDLSource.is_playlist(queries[0]):
+            result = await self.process_playlist(ctx, queries[0], ctx.author)
+        else:
+            result = await self.process_song(ctx, queries[0], ctx.author)
         
         # Enviar confirmación si hay resultado
         if result:
             embed = EmbedCreator.create_basic_embed("✅ Añadido a la cola", result)
-            await ctx.send(embed=embed)
+            await self.send(ctx, embed=embed)
     
     @commands.command(name="skip", aliases=["s"])
     async def skip(self, ctx):
         """Skip the current song."""
-        # Actualizar el canal de comando
-        self.command_channels[ctx.guild.id] = ctx.channel.id
-        
         if not ctx.voice_client or not ctx.voice_client.is_playing():
-            await ctx.send("❌ No hay ninguna canción reproduciéndose actualmente.")
+            await self.send(ctx, "❌ No hay ninguna canción reproduciéndose actualmente.")
             return
         
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
-        # Obtener el título de la canción antes de saltarla
-        current_title = queue.current.title if queue.current else "Unknown"
-        
-        # Primero detener la reproducción actual
-        ctx.voice_client.stop()
-        
-        # Eliminar código referente al modo loop
-        # Ya no necesitamos esto:
-        # old_loop_state = queue.loop
-        # queue.loop = False
-        # ...
-        # queue.loop = old_loop_state
+        # El reproductor detiene la canción y pasa a la siguiente
+        skipped = await self.guild_music_state.get_player(ctx.guild.id).submit('skip')
         
         # Enviar mensaje confirmando el salto
-        await ctx.send(f"⏭️ **Saltada:** {current_title}")
+        await self.send(ctx, f"⏭️ **Saltada:** {skipped.title if skipped else 'Unknown'}")
     
     @commands.command(name="queue", aliases=["q", "qu"])
     async def queue_cmd(self, ctx, page: int = 1):
@@ -217,62 +214,21 @@ class Music(commands.Cog):
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
-        # Lista para mostrar la cola
-        display_queue = []
-        
-        # Añadir canción actual si existe
-        if queue.current:
-            display_queue.append({"position": 0, "song": queue.current, "current": True})
-        
-        # Añadir canciones en cola
-        for i, song in enumerate(queue.queue):
-            display_queue.append({"position": i+1, "song": song, "current": False})
-        
-        if not display_queue:
-            await ctx.send("La cola está vacía.")
+        total = len(queue) + (1 if queue.current else 0)
+        if not total:
+            await self.send(ctx, "La cola está vacía.")
             return
         
-        # Ajustar número de página a índice base 0
-        page_idx = max(0, page - 1)
-        
-        # Crear un embed elegante para mostrar la cola
-        embed = discord.Embed(
-            title="🎵 Cola de reproducción",
-            color=0x9B59B6  # Color morado
-        )
-        
-        # Determinar el número de canciones por página
+        # Ajustar número de página a índice base 0, volviendo a la primera si no existe
         songs_per_page = 10
-        pages = (len(display_queue) + songs_per_page - 1) // songs_per_page
-        
-        # Asegurarse de que la página solicitada existe
+        pages = (total + songs_per_page - 1) // songs_per_page
+        page_idx = max(0, page - 1)
         if page_idx >= pages:
             page_idx = 0
         
-        # Calcular las canciones para esta página
-        start = page_idx * songs_per_page
-        end = min(start + songs_per_page, len(display_queue))
-        page_songs = display_queue[start:end]
-        
-        # Calcular la duración total de todas las canciones
-        total_duration = "Unknown"
-        
-        # Añadir cada canción a la descripción
-        description = ""
-        for item in page_songs:
-            song = item["song"]
-            position = item["position"]
-            if item["current"]:
-                description += f"**🔊 Ahora:** {song.title} [{song.duration}] (pedida por {song.requester.display_name})\n\n"
-            else:
-                description += f"**{position}.** {song.title} [{song.duration}] (pedida por {song.requester.display_name})\n\n"
-        
-        embed.description = description
-        
-        # Añadir información de la página
-        embed.set_footer(text=f"Página {page_idx+1} de {pages} | {len(display_queue)} canción(es) en total")
-        
-        await ctx.send(embed=embed)
+        # La página se reutiliza mientras la cola no cambie
+        embed = EmbedCreator.create_queue_page_embed(queue, page_idx, ctx.guild, songs_per_page)
+        await self.send(ctx, embed=embed)
     
     @commands.command(name="nowplaying", aliases=["np"])
     async def now_playing(self, ctx):
@@ -280,38 +236,56 @@ class Music(commands.Cog):
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
-        if not ctx.voice_client or not ctx.voice_client.is_playing() or not queue.current:
-            await ctx.send("Nothing is playing right now.")
+        if not ctx.voice_client or not (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()) or not queue.current:
+            await self.send(ctx, "Nothing is playing right now.")
             return
         
-        # Just use 0 for position since getting accurate position is difficult
-        # without access to the internal player state
-        position = 0
+        # El reproductor cuenta los frames enviados, así que la posición es exacta
+        position = self.guild_music_state.get_player(ctx.guild.id).position
         
         embed = EmbedCreator.create_now_playing_embed(queue.current, position)
-        await ctx.send(embed=embed)
+        await self.send(ctx, embed=embed)
     
     @commands.command(name="seek")
     async def seek(self, ctx, time_str: str):
         """Seek to a specific position in the song (format: MM:SS)."""
-        # Método eliminado
+        queue = self.guild_music_state.get_queue(ctx.guild.id)
+        queue.update_activity()
+        
+        if not ctx.voice_client or not (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()) or not queue.current:
+            await self.send(ctx, "Nothing is playing right now.")
+            return
+        
+        position = YTDLSource.parse_timestamp(time_str)
+        if position is None:
+            await self.send(ctx, "❌ Formato inválido. Usa `fz!seek MM:SS`.")
+            return
+        
+        song = queue.current
+        if song.duration and position >= song.duration:
+            await self.send(ctx, f"❌ La canción solo dura {song.formatted_duration}.")
+            return
+        
+        # El reproductor reinicia ffmpeg en esa posición con la URL de stream que ya tiene
+        if await self.guild_music_state.get_player(ctx.guild.id).submit('seek', position):
+            await self.send(ctx, f"⏩ Posición: {EmbedCreator.format_time(position)}")
+        else:
+            await self.send(ctx, "❌ No se pudo saltar a esa posición.")
     
     @commands.command(name="stop")
     async def stop(self, ctx):
         """Stop playback and clear the queue."""
         if not ctx.voice_client or not ctx.voice_client.is_playing():
-            await ctx.send("Nothing is playing right now.")
+            await self.send(ctx, "Nothing is playing right now.")
             return
         
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
         # Clear the queue and stop playing
-        queue.clear()
-        queue.current = None
-        ctx.voice_client.stop()
+        await self.guild_music_state.get_player(ctx.guild.id).submit('stop')
         
-        await ctx.send("⏹️ Playback stopped and queue cleared.")
+        await self.send(ctx, "⏹️ Playback stopped and queue cleared.")
     
     @commands.command(name="remove")
     async def remove(self, ctx, index: int):
@@ -323,15 +297,15 @@ class Music(commands.Cog):
         idx = index - 1
         
         if idx < 0 or idx >= len(queue.queue):
-            await ctx.send(f"Invalid index. Queue has {len(queue.queue)} songs.")
+            await self.send(ctx, f"Invalid index. Queue has {len(queue.queue)} songs.")
             return
         
-        removed_song = queue.remove(idx)
+        removed_song = await self.guild_music_state.get_player(ctx.guild.id).submit('remove', idx)
         
         if removed_song:
-            await ctx.send(f"🗑️ Removed **{removed_song.title}** from the queue.")
+            await self.send(ctx, f"🗑️ Removed **{removed_song.title}** from the queue.")
         else:
-            await ctx.send("Failed to remove the song.")
+            await self.send(ctx, "Failed to remove the song.")
     
     @commands.command(name="clear")
     async def clear(self, ctx):
@@ -339,37 +313,38 @@ class Music(commands.Cog):
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
-        queue.clear()
-        await ctx.send("🧹 Queue cleared.")
+        await self.guild_music_state.get_player(ctx.guild.id).submit('clear')
+        await self.send(ctx, "🧹 Queue cleared.")
     
     @commands.command(name="pause")
     async def pause(self, ctx):
         """Pause the current song."""
         if not ctx.voice_client or not ctx.voice_client.is_playing():
-            await ctx.send("Nothing is playing right now.")
+            await self.send(ctx, "Nothing is playing right now.")
             return
         
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
-        ctx.voice_client.pause()
-        await ctx.send("⏸️ Paused.")
+        if await self.guild_music_state.get_player(ctx.guild.id).submit('pause'):
+            await self.send(ctx, "⏸️ Paused.")
+        else:
+            await self.send(ctx, "Nothing is playing right now.")
     
     @commands.command(name="resume")
     async def resume(self, ctx):
         """Resume the paused song."""
         if not ctx.voice_client:
-            await ctx.send("Not connected to a voice channel.")
+            await self.send(ctx, "Not connected to a voice channel.")
             return
         
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
-        if ctx.voice_client.is_paused():
-            ctx.voice_client.resume()
-            await ctx.send("▶️ Resumed.")
+        if await self.guild_music_state.get_player(ctx.guild.id).submit('resume'):
+            await self.send(ctx, "▶️ Resumed.")
         else:
-            await ctx.send("The music is not paused.")
+            await self.send(ctx, "The music is not paused.")
     
     @commands.command(name="shuffle")
     async def shuffle(self, ctx):
@@ -380,48 +355,49 @@ class Music(commands.Cog):
     async def volume(self, ctx, volume: int):
         """Adjust the volume (1-100)."""
         if not ctx.voice_client:
-            await ctx.send("Not connected to a voice channel.")
+            await self.send(ctx, "Not connected to a voice channel.")
             return
         
         queue = self.guild_music_state.get_queue(ctx.guild.id)
         queue.update_activity()
         
         if not 0 <= volume <= 100:
-            await ctx.send("Volume must be between 0 and 100.")
+            await self.send(ctx, "Volume must be between 0 and 100.")
             return
         
-        # Set volume for the queue (for future songs)
-        queue.volume = volume / 100
-        
-        # Set volume for the current playback
-        if ctx.voice_client.source:
-            ctx.voice_client.source.volume = volume / 100
-        
-        await ctx.send(f"🔊 Volume set to {volume}%")
+        # Set volume for the current playback and for future songs
+        if await self.guild_music_state.get_player(ctx.guild.id).submit('volume', volume / 100):
+            await self.send(ctx, f"🔊 Volume set to {volume}%")
+        else:
+            await self.send(ctx, f"🔊 Volume set to {volume}% (se aplicará desde la siguiente canción)")
     
     @commands.command(name="dc", aliases=["disconnect"])
     async def disconnect(self, ctx):
         """Disconnect the bot from the voice channel."""
         if not ctx.voice_client:
-            await ctx.send("Not connected to a voice channel.")
+            await self.send(ctx, "Not connected to a voice channel.")
             return
         
-        # Clear the queue for this guild
-        if ctx.guild.id in self.guild_music_state.queues:
-            del self.guild_music_state.queues[ctx.guild.id]
-        
-        # Disconnect
-        await ctx.voice_client.disconnect()
+        # Clear the queue and disconnect
+        await self.guild_music_state.get_player(ctx.guild.id).submit('disconnect')
+        self.guild_music_state.remove_player(ctx.guild.id)
+        self.guild_music_state.remove_queue(ctx.guild.id)
         
         # Remove from voice clients dict
         if ctx.guild.id in self.guild_music_state.voice_clients:
             del self.guild_music_state.voice_clients[ctx.guild.id]
         
-        await ctx.send("👋 Disconnected from voice channel.")
+        await self.send(ctx, "👋 Disconnected from voice channel.")
     
     @commands.command(name="help")
     async def help_command(self, ctx):
         """Show help for the music bot commands."""
+        # El embed de ayuda no cambia, así que se construye una sola vez
+        embed = EmbedCreator.static_embed("music_help", self._build_help_embed)
+        await self.send(ctx, embed=embed)
+    
+    @staticmethod
+    def _build_help_embed():
         # Color morado (en hexadecimal)
         embed = discord.Embed(
             title="🎵 FzMusic - Comandos",
@@ -432,7 +408,7 @@ class Music(commands.Cog):
         # Comandos básicos con sus aliases
         embed.add_field(
             name="Comandos básicos",
-            value="`fz!play` o `fz!p` - Reproduce una canción desde YouTube (solo URLs directas)\n"
+            value="`fz!play` o `fz!p` - Reproduce una canción desde YouTube (URL o búsqueda, varias separadas por `|`)\n"
                   "`fz!skip` o `fz!s` - Salta la canción actual\n"
                   "`fz!queue` o `fz!q` o `fz!qu` - Muestra la cola de reproducción\n"
                   "`fz!pause` - Pausa la reproducción\n"
@@ -445,6 +421,7 @@ class Music(commands.Cog):
             name="Comandos avanzados",
             value="`fz!nowplaying` o `fz!np` - Muestra información sobre la canción actual\n"
                   "`fz!volume` o `fz!vol` - Ajusta el volumen (1-100)\n"
+                  "`fz!seek` - Salta a una posición de la canción (MM:SS)\n"
                   "`fz!clear` - Limpia la cola de reproducción\n"
                   "`fz!remove` - Elimina una canción específica de la cola por su número\n"
                   "`fz!dc` o `fz!disconnect` - Desconecta el bot del canal de voz",
@@ -452,9 +429,7 @@ class Music(commands.Cog):
         )
         
         embed.set_footer(text="FzMusic Bot")
-        embed.timestamp = datetime.datetime.now()
-        
-        await ctx.send(embed=embed)
+        return embed
     
     @play.before_invoke
     async def ensure_voice(self, ctx):
@@ -462,82 +437,5 @@ class Music(commands.Cog):
         if not await self.join_voice_channel(ctx):
             raise commands.CommandError("Could not join voice channel.")
 
-    def set_song_finished(self, guild_id):
-        """Marca una canción como finalizada para su procesamiento posterior"""
-        self.song_finished_flags[guild_id] = True
-
-    @tasks.loop(seconds=0.5)
-    async def process_finished_songs(self):
-        """Procesa canciones que han finalizado de forma segura."""
-        # Copiar el diccionario para evitar errores de modificación durante la iteración
-        flags_to_process = self.song_finished_flags.copy()
-        self.song_finished_flags.clear()
-        
-        for guild_id in flags_to_process:
-            try:
-                guild = self.bot.get_guild(guild_id)
-                if not guild:
-                    continue
-                
-                # Usar el canal registrado si existe
-                text_channel = None
-                if guild_id in self.command_channels:
-                    channel_id = self.command_channels[guild_id]
-                    channel = guild.get_channel(channel_id)
-                    if channel and channel.permissions_for(guild.me).send_messages:
-                        text_channel = channel
-                
-                # Si no tenemos un canal registrado, buscar cualquiera como fallback
-                if not text_channel:
-                    for channel in guild.text_channels:
-                        if channel.permissions_for(guild.me).send_messages:
-                            text_channel = channel
-                            break
-                
-                if not text_channel:
-                    continue
-                
-                # Crear un contexto falso
-                ctx = SimpleContext(self.bot, text_channel)
-                
-                # Obtener el cliente de voz
-                voice_client = guild.voice_client
-                if not voice_client:
-                    continue
-                
-                # Solo reproducir la siguiente canción si no se está reproduciendo nada
-                if not voice_client.is_playing():
-                    # Verificar si hay una próxima canción antes de enviar el mensaje
-                    queue = self.guild_music_state.get_queue(guild_id)
-                    if queue and (queue.queue or queue.current):
-                        await self.play_next(ctx)
-                    # Si no hay una próxima canción, limpiamos
-                    else:
-                        # No hay más canciones, limpiamos las referencias
-                        if guild_id in self.command_channels:
-                            del self.command_channels[guild_id]
-            except Exception as e:
-                logger.error(f"Error processing finished song for guild {guild_id}: {e}")
-
-    @process_finished_songs.before_loop
-    async def before_process_finished_songs(self):
-        await self.bot.wait_until_ready()
-
-class SimpleContext:
-    """Un contexto simple para usar cuando no tenemos un contexto de comando real."""
-    def __init__(self, bot, channel):
-        self.bot = bot
-        self.channel = channel
-        self.guild = channel.guild
-        self.author = channel.guild.me
-        self.voice_client = channel.guild.voice_client
-    
-    async def send(self, content=None, *, embed=None):
-        try:
-            return await self.channel.send(content=content, embed=embed)
-        except Exception as e:
-            logger.error(f"Error sending message in SimpleContext: {e}")
-            return None
-
 async def setup(bot):
     await bot.add_cog(Music(bot))
\ No newline at end of file
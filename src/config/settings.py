@@ -9,4 +9,60 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")  # Default to 'ffmpeg' if not set
 PREFIX = "fz!"  # Command prefix for the bot
 
+# Prefetching of upcoming songs
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "3"))  # Songs resolved ahead of time
+PREOPEN_SECONDS = float(os.getenv("PREOPEN_SECONDS", "5"))  # Open ffmpeg this early (0 disables it)
+
+# yt-dlp extraction cache
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "1024"))  # Entries kept in memory
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", "86400"))  # Metadata lifetime in seconds
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB")  # SQLite file for the on-disk tier (unset disables it)
+
+# Search term -> video ID cache
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "21600"))  # Seconds a search result is reused
+
+# Reusable YoutubeDL instances per option profile
+YTDL_POOL_SIZE = int(os.getenv("YTDL_POOL_SIZE", "4"))
+
+# Dedicated extraction executor
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))  # Concurrent extractions in total
+EXTRACTION_GUILD_LIMIT = int(os.getenv("EXTRACTION_GUILD_LIMIT", "2"))  # Concurrent extractions per guild
+EXTRACTION_USE_PROCESSES = os.getenv("EXTRACTION_USE_PROCESSES", "false").lower() in ("1", "true", "yes")
+
+# Playlist ingestion
+PLAYLIST_BATCH_SIZE = int(os.getenv("PLAYLIST_BATCH_SIZE", "25"))  # Entries added to the queue at a time
+
+# Audio output: "opus" lets ffmpeg produce Opus (volume applied in ffmpeg, changes take effect
+# on the next song); "pcm" scales PCM with NumPy in Python so the volume can change while playing
+AUDIO_ENGINE = os.getenv("AUDIO_ENGINE", "opus").lower()
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "128"))  # kbps when ffmpeg encodes to Opus
+
+# Crossfade between consecutive songs in seconds (0 disables it; forces the "pcm" engine)
+CROSSFADE_SECONDS = float(os.getenv("CROSSFADE_SECONDS", "0"))
+
+# On-disk cache of transcoded songs (unset disables it). The index and size limit live in each
+# process, so with SHARD_MODE=processes every worker uses its own worker-<N> subdirectory and
+# the disk used can reach SHARD_PROCESSES x AUDIO_CACHE_MAX_MB
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR")
+if AUDIO_CACHE_DIR and os.getenv("SHARD_WORKER_INDEX"):
+    AUDIO_CACHE_DIR = os.path.join(AUDIO_CACHE_DIR, f"worker-{os.getenv('SHARD_WORKER_INDEX')}")
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "2048"))  # Least recently used files are evicted past this size
+
+# SQLite file where the guild queues are saved to survive restarts (unset disables it)
+QUEUE_STATE_DB = os.getenv("QUEUE_STATE_DB")
+
+# Health/status web server (/, /healthz, /status, /metrics). With SHARD_MODE=processes worker N listens on KEEP_ALIVE_PORT + N
+KEEP_ALIVE_HOST = os.getenv("KEEP_ALIVE_HOST", "0.0.0.0")
+KEEP_ALIVE_PORT = int(os.getenv("KEEP_ALIVE_PORT", "8080"))
+
+# Prometheus metrics on the keep-alive server's /metrics (disabled by default)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Sharding: "single" (one Bot), "auto" (AutoShardedBot) or "processes" (one process per shard range)
+SHARD_MODE = os.getenv("SHARD_MODE", "single").lower()
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None  # None asks Discord
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "2"))  # Worker processes in "processes" mode
+SHARD_RESTART_DELAY = float(os.getenv("SHARD_RESTART_DELAY", "5"))  # Seconds before restarting a crashed shard
+
 # Other settings can be added here as needed
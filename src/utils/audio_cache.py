@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import mmap
+import os
+import time
+from collections import OrderedDict
+import discord
+from discord.oggparse import OggPage
+
+# Ogg Opus granule positions count samples at 48 kHz
+OPUS_SAMPLE_RATE = 48000
+
+logger = logging.getLogger('audio_cache')
+
+CACHE_EXTENSION = '.ogg'
+
+# A temporary file not written to for this long belongs to an abandoned fill
+STALE_TEMP_SECONDS = 600
+
+class OggFileAudio(discord.AudioSource):
+    """Opus source that reads the packets of a cached Ogg file directly.
+
+    The file is memory-mapped and parsed in Python, so playing a cached song
+    needs neither ffmpeg nor any network access. With `start` (seconds), the
+    pages before that position are skipped using their granule positions.
+    """
+    def __init__(self, path, start=0):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._packets = self._iter_packets(int(start * OPUS_SAMPLE_RATE))
+
+    def _iter_packets(self, start_granule):
+        partial = b''
+        skipping = start_granule > 0
+        while self._map.read(4) == b'OggS':
+            page = OggPage(self._map)
+            if skipping:
+                # gran_pos es la posición al final de la página
+                if page.gran_pos < start_granule:
+                    continue
+                skipping = False
+                # Descartar el trozo de paquete que empezó en una página saltada
+                drop_first = bool(page.flag & 0x01)
+            else:
+                drop_first = False
+            for data, complete in page.iter_packets():
+                if drop_first:
+                    drop_first = not complete
+                    continue
+                partial += data
+                if complete:
+                    yield partial
+                    partial = b''
+
+    def is_opus(self):
+        return True
+
+    def read(self):
+        for packet in self._packets:
+            # Las cabeceras OpusHead/OpusTags no son audio
+            if packet.startswith((b'OpusHead', b'OpusTags')):
+                continue
+            return packet
+        return b''
+
+    def cleanup(self):
+        self._packets = iter(())
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+class AudioCache:
+    """On-disk cache of songs transcoded to Ogg/Opus, keyed by video ID.
+
+    Files are stored as `<directory>/<2 chars>/<video_id>.ogg` and evicted in
+    least recently used order once the total size passes `max_bytes`. A song
+    is downloaded in the background (`schedule_fill`) the first time it
+    plays, so later plays read it from disk. With no `directory` the cache is
+    disabled and every method is a no-op.
+    """
+    def __init__(self, directory=None, max_bytes=2 * 1024 ** 3, ffmpeg='ffmpeg', bitrate=128,
+                 max_duration=1800, max_fills=2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ffmpeg = ffmpeg
+        self.bitrate = bitrate
+        self.max_duration = max_duration  # Longer songs (streams, mixes...) are not cached
+        self.max_fills = max_fills
+        self._files = OrderedDict()  # video_id -> size in bytes, least recently used first
+        self._size = 0
+        self._filling = set()
+        self._semaphore = None
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.fills = 0
+
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self._scan()
+            except OSError as e:
+                logger.error(f"Could not open audio cache directory {directory}: {e}")
+                self.directory = None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    @property
+    def size(self):
+        """Total size of the cached files in bytes."""
+        return self._size
+
+    def __len__(self):
+        return len(self._files)
+
+    def __contains__(self, video_id):
+        return video_id in self._files
+
+    def _path(self, video_id):
+        return os.path.join(self.directory, video_id[:2], video_id + CACHE_EXTENSION)
+
+    def _scan(self):
+        """Index the files left by previous runs, oldest access first."""
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                if file.name.endswith('.tmp'):
+                    # Solo se borran las descargas cuyo proceso ya no existe
+                    if self._is_stale_temp(file):
+                        os.remove(file.path)
+                elif file.name.endswith(CACHE_EXTENSION):
+                    stat = file.stat()
+                    found.append((stat.st_mtime, file.name[:-len(CACHE_EXTENSION)], stat.st_size))
+        for _, video_id, size in sorted(found):
+            self._files[video_id] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def _is_stale_temp(file):
+        """Check if a `<video_id>.ogg.<pid>.tmp` file was left by a fill that is no longer running."""
+        try:
+            pid = int(file.name.rsplit('.', 2)[-2])
+            os.kill(pid, 0)
+        except (ValueError, ProcessLookupError):
+            return True
+        except PermissionError:
+            pass  # El proceso existe, pero es de otro usuario
+        try:
+            return time.time() - file.stat().st_mtime > STALE_TEMP_SECONDS
+        except OSError:
+            return False
+
+    def lookup(self, video_id):
+        """Return the path of the cached file for a video ID, or None on a miss."""
+        if not self.enabled or not video_id or video_id not in self._files:
+            return None
+
+        path = self._path(video_id)
+        try:
+            # El mtime guarda el orden LRU entre reinicios
+            os.utime(path)
+        except OSError:
+            self._forget(video_id)
+            return None
+
+        self._files.move_to_end(video_id)
+        return path
+
+    def record_play(self, video_id):
+        """Count a song starting to play as a hit or a miss.
+
+        Counted once per play, since a song can be looked up several times
+        (pre-opened by the prefetcher, then opened again to play or seek).
+        """
+        if not self.enabled or not video_id:
+            return
+        size = self._files.get(video_id)
+        if size is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.bytes_saved += size
+
+    def stats(self):
+        """Counters for logging and monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            'files': len(self._files),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'fills': self.fills,
+        }
+
+    def schedule_fill(self, video_id, stream_url, duration=None, copy=False):
+        """Download and transcode a song in the background if it isn't cached yet.
+
+        With `copy` the stream is already Opus and is only remuxed into Ogg.
+        """
+        if not self.enabled or not video_id or not stream_url:
+            return
+        if video_id in self._files or video_id in self._filling:
+            return
+        if not duration or duration > self.max_duration:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_fills)
+        self._filling.add(video_id)
+        asyncio.get_event_loop().create_task(self._fill(video_id, stream_url, copy))
+
+    async def _fill(self, video_id, stream_url, copy):
+        path = self._path(video_id)
+        # Único por proceso, por si dos procesos acaban compartiendo el directorio
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        codec = ['-c:a', 'copy'] if copy else ['-c:a', 'libopus', '-b:a', f'{self.bitrate}k']
+        try:
+            async with self._semaphore:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg, '-nostdin', '-loglevel', 'error',
+                    '-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5',
+                    '-i', stream_url, '-vn', *codec, '-f', 'ogg', '-y', temp_path,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    _, stderr = await process.communicate()
+                except asyncio.CancelledError:
+                    process.kill()
+                    raise
+                if process.returncode != 0:
+                    logger.error(f"Error caching {video_id}: {stderr.decode(errors='replace').strip()}")
+                    return
+
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+            self._files[video_id] = size
+            self._size += size
+            self.fills += 1
+            self._evict()
+        except Exception as e:
+            logger.error(f"Error caching {video_id}: {e}")
+        finally:
+            self._filling.discard(video_id)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _forget(self, video_id):
+        size = self._files.pop(video_id, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._files:
+            video_id = next(iter(self._files))
+            self._forget(video_id)
+            try:
+                os.remove(self._path(video_id))
+            except OSError as e:
+                logger.error(f"Error evicting {video_id} from the audio cache: {e}")
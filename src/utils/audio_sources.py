@@ -0,0 +1,305 @@
+import ctypes
+import threading
+from collections import deque
+import discord
+import numpy as np
+from discord.opus import Encoder
+
+# Number of 20 ms frames a volume change is spread over
+VOLUME_RAMP_FRAMES = 10
+
+class NumpyVolumeSource(discord.AudioSource):
+    """PCM source that applies its volume with vectorised NumPy operations.
+
+    Frames are copied into a preallocated buffer and scaled in place, and
+    volume changes are ramped over a few frames to avoid clicks. The frame
+    returned by `read` is that shared buffer, so it is only valid until the
+    next call (the voice client encodes it right away).
+    """
+    def __init__(self, original, volume=0.5):
+        if original.is_opus():
+            raise discord.ClientException('NumpyVolumeSource needs a PCM source.')
+
+        self.original = original
+        self._buffer = (ctypes.c_char * Encoder.FRAME_SIZE)()
+        self._samples = np.frombuffer(self._buffer, dtype=np.int16)
+        self._scratch = np.empty(self._samples.shape, dtype=np.float32)
+        self._ramp = np.empty(self._samples.shape, dtype=np.float32)
+        # 0..1 a lo largo de un frame, repetido para cada canal
+        self._unit = np.repeat(
+            np.arange(Encoder.SAMPLES_PER_FRAME, dtype=np.float32) / Encoder.SAMPLES_PER_FRAME,
+            Encoder.CHANNELS
+        )
+
+        self._gain = max(volume, 0.0)
+        self._target = self._gain
+        self._step = 0.0
+        self._ramp_left = 0
+
+    @property
+    def volume(self):
+        """Target volume as a float (1.0 is 100%)."""
+        return self._target
+
+    @volume.setter
+    def volume(self, value):
+        self._target = max(value, 0.0)
+        self._ramp_left = VOLUME_RAMP_FRAMES
+        self._step = (self._target - self._gain) / VOLUME_RAMP_FRAMES
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.original.cleanup()
+
+    def read(self):
+        data = self.original.read()
+        if not data:
+            return data
+
+        if self._ramp_left:
+            start = self._gain
+            self._gain = self._target if self._ramp_left == 1 else self._gain + self._step
+            self._ramp_left -= 1
+        elif self._gain == 1.0:
+            return data
+        else:
+            start = None
+
+        # El último frame puede venir incompleto; no vale la pena optimizarlo
+        if len(data) != Encoder.FRAME_SIZE:
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) * self._gain
+            return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+        ctypes.memmove(self._buffer, data, Encoder.FRAME_SIZE)
+        if start is None:
+            np.multiply(self._samples, self._gain, out=self._scratch, casting='unsafe')
+        else:
+            # Interpolar la ganancia dentro del frame para que el cambio sea suave
+            np.multiply(self._unit, self._gain - start, out=self._ramp)
+            self._ramp += start
+            np.multiply(self._samples, self._ramp, out=self._scratch)
+        np.clip(self._scratch, -32768, 32767, out=self._scratch)
+        np.copyto(self._samples, self._scratch, casting='unsafe')
+        return self._buffer
+
+FRAMES_PER_SECOND = 1000 // Encoder.FRAME_LENGTH
+SILENCE = b'\x00' * Encoder.FRAME_SIZE
+
+class TrackedSource(discord.AudioSource):
+    """Wrapper that counts the frames read to know the playback position.
+
+    Every frame is 20 ms of audio whether it is PCM or Opus, so the position
+    is exact and doesn't advance while the player is paused. `start` is the
+    position (in seconds) the wrapped source begins at, e.g. after a seek.
+    `on_first_frame()` is called from the audio thread when the first frame
+    is read.
+    """
+    def __init__(self, original, start=0, on_first_frame=None):
+        self.original = original
+        self.start = start
+        self.frames = 0
+        self.on_first_frame = on_first_frame
+
+    @property
+    def position(self):
+        """Seconds of the song played so far."""
+        return self.start + self.frames / FRAMES_PER_SECOND
+
+    @property
+    def live_volume(self):
+        """True if the volume can change while playing."""
+        return isinstance(self.original, NumpyVolumeSource)
+
+    @property
+    def volume(self):
+        return getattr(self.original, 'volume', 1.0)
+
+    @volume.setter
+    def volume(self, value):
+        if self.live_volume:
+            self.original.volume = value
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.original.cleanup()
+
+    def read(self):
+        data = self.original.read()
+        if data:
+            if not self.frames and self.on_first_frame:
+                self.on_first_frame()
+            self.frames += 1
+        return data
+
+class _Track:
+    """A song inside a CrossfadeSource, with the frames read ahead of time."""
+    def __init__(self, source, duration, tag, preroll_done=True, start=0):
+        self.source = source
+        self.tag = tag
+        self.total = int(duration * FRAMES_PER_SECOND) if duration else None
+        self.position = int(start * FRAMES_PER_SECOND)
+        self.preroll = deque()
+        self.preroll_done = threading.Event()
+        if preroll_done:
+            self.preroll_done.set()
+
+    def read(self):
+        # Mientras el hilo de pre-roll siga leyendo, solo se consume lo que ya dejó en el buffer
+        if not self.preroll and not self.preroll_done.is_set():
+            self.preroll_done.wait(Encoder.FRAME_LENGTH / 1000)
+        if self.preroll:
+            frame = self.preroll.popleft()
+        elif self.preroll_done.is_set():
+            frame = self.source.read()
+        else:
+            frame = SILENCE
+        if frame:
+            self.position += 1
+        return frame
+
+class CrossfadeSource(discord.AudioSource):
+    """PCM source that overlaps the end of a song with the start of the next one.
+
+    The next song is handed over with `queue_next`; its first frames are read
+    into a bounded pre-roll buffer by a helper thread so the audio thread never
+    waits for ffmpeg to start. Over the last `fade_seconds` of the current song
+    both are mixed, then the next song takes over and `on_advance(tag)` is
+    called (from the audio thread). If no next song was queued in time, the
+    source ends as usual.
+    """
+    # Margin before the reported end, since yt-dlp durations are rounded
+    END_MARGIN_FRAMES = FRAMES_PER_SECOND // 2
+
+    # Mixing always allows changing the volume while playing
+    live_volume = True
+
+    def __init__(self, source, duration, fade_seconds, tag=None, preroll_seconds=3, on_advance=None, start=0):
+        self.fade_frames = max(1, int(fade_seconds * FRAMES_PER_SECOND))
+        self.preroll_capacity = self.fade_frames + int(preroll_seconds * FRAMES_PER_SECOND)
+        self.on_advance = on_advance
+        self._current = _Track(source, duration, tag, start=start)
+        self._next = None
+        self._lock = threading.Lock()
+
+        self._buffer = (ctypes.c_char * Encoder.FRAME_SIZE)()
+        self._samples = np.frombuffer(self._buffer, dtype=np.int16)
+        self._mix = np.empty(self._samples.shape, dtype=np.float32)
+        self._scratch = np.empty(self._samples.shape, dtype=np.float32)
+
+    @property
+    def current_tag(self):
+        return self._current.tag if self._current else None
+
+    @property
+    def next_tag(self):
+        return self._next.tag if self._next else None
+
+    @property
+    def position(self):
+        """Seconds of the current song played so far."""
+        return self._current.position / FRAMES_PER_SECOND if self._current else 0
+
+    @property
+    def volume(self):
+        source = self._current.source if self._current else None
+        return getattr(source, 'volume', 1.0)
+
+    @volume.setter
+    def volume(self, value):
+        for track in (self._current, self._next):
+            if track and isinstance(track.source, NumpyVolumeSource):
+                track.source.volume = value
+
+    def is_opus(self):
+        return False
+
+    def queue_next(self, source, duration, tag=None):
+        """Hand over the song that follows the current one."""
+        track = _Track(source, duration, tag, preroll_done=False)
+        with self._lock:
+            self._discard_next()
+            self._next = track
+        threading.Thread(target=self._fill_preroll, args=(track,), daemon=True).start()
+
+    def cancel_next(self):
+        """Drop the queued next song (e.g. it was removed from the queue)."""
+        with self._lock:
+            self._discard_next()
+
+    def _discard_next(self):
+        track, self._next = self._next, None
+        # Si el hilo de pre-roll sigue activo, él mismo cierra el source al ver que se descartó
+        if track and track.preroll_done.is_set():
+            track.source.cleanup()
+
+    def _fill_preroll(self, track):
+        try:
+            while len(track.preroll) < self.preroll_capacity:
+                frame = track.source.read()
+                with self._lock:
+                    if self._next is not track and self._current is not track:
+                        track.source.cleanup()
+                        return
+                if not frame:
+                    break
+                track.preroll.append(bytes(frame))
+        finally:
+            with self._lock:
+                track.preroll_done.set()
+
+    def cleanup(self):
+        with self._lock:
+            self._discard_next()
+            if self._current:
+                self._current.source.cleanup()
+                self._current = None
+
+    def read(self):
+        with self._lock:
+            current = self._current
+            if current is None:
+                return b''
+
+            data = current.read()
+            if not data:
+                # La canción terminó antes de tiempo: pasar directamente a la siguiente
+                if not self._advance():
+                    return b''
+                return self._current.read()
+
+            following = self._next
+            if following is None or current.total is None:
+                return data
+            fade_start = current.total - self.fade_frames - self.END_MARGIN_FRAMES
+            if current.position <= fade_start or len(data) != Encoder.FRAME_SIZE:
+                return data
+
+            incoming = following.read()
+            if len(incoming) != Encoder.FRAME_SIZE:
+                incoming = SILENCE
+            progress = min(1.0, (current.position - fade_start) / self.fade_frames)
+
+            np.multiply(np.frombuffer(data, dtype=np.int16), 1.0 - progress, out=self._mix, casting='unsafe')
+            np.multiply(np.frombuffer(incoming, dtype=np.int16), progress, out=self._scratch, casting='unsafe')
+            self._mix += self._scratch
+            np.clip(self._mix, -32768, 32767, out=self._mix)
+            np.copyto(self._samples, self._mix, casting='unsafe')
+
+            if progress >= 1.0:
+                self._advance()
+            return self._buffer
+
+    def _advance(self):
+        """Make the next song current. Returns False if there is none."""
+        finished, following = self._current, self._next
+        finished.source.cleanup()
+        self._current, self._next = following, None
+        if following is None:
+            return False
+        if self.on_advance:
+            self.on_advance(following.tag)
+        return True
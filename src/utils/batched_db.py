@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger('batched_db')
+
+class BatchedDatabase:
+    """SQLite (WAL) database whose writes are batched and run off the event loop.
+
+    The owner keeps its pending changes and calls `schedule()` after each
+    one. `flush_interval` seconds later `collect()` is called on the event
+    loop to take them, and `write(db, batch)` runs in the default executor
+    inside a single transaction. Reads go through `reader`, a second
+    connection used only from the event loop; with WAL it can read while a
+    write is in progress, so it never waits for the writer.
+    """
+    def __init__(self, path, schema, collect, write, flush_interval=2.0):
+        self.flush_interval = flush_interval
+        self._collect = collect
+        self._write = write
+        self._task = None
+        self._lock = threading.Lock()  # flush() on shutdown can overlap with a write still running in the executor
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            for statement in schema:
+                self._db.execute(statement)
+            self._db.commit()
+            self.reader = sqlite3.connect(path, check_same_thread=False)
+            self.reader.execute('PRAGMA query_only=ON')
+        except sqlite3.Error:
+            self._db.close()
+            raise
+
+    def schedule(self):
+        """Write the pending changes with the next batch."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        batch = self._collect()
+        if batch:
+            # La escritura (y el fsync) se hace fuera del event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._run_write, batch)
+
+    def _run_write(self, batch):
+        try:
+            with self._lock, self._db:
+                self._write(self._db, batch)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing batch: {e}")
+
+    def flush(self):
+        """Write every pending change right away (e.g. on shutdown)."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        batch = self._collect()
+        if batch:
+            self._run_write(batch)
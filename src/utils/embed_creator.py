@@ -1,9 +1,28 @@
 import discord
 import datetime
 import math
+import weakref
+from collections import OrderedDict
 
 class EmbedCreator:
-    """Class to create consistent embeds for the music bot."""
+    """Class to create consistent embeds for the music bot.
+
+    Embeds that don't change are rendered once and reused: static ones (help)
+    forever, now-playing templates per song and queue pages until the queue's
+    version changes. Reused embeds are shared, so callers must not modify them.
+    """
+    _static = {}  # name -> embed
+    _now_playing = OrderedDict()  # song key -> (embed, embed dict)
+    _queue_pages = weakref.WeakKeyDictionary()  # MusicQueue -> (version, {page: embed})
+    NOW_PLAYING_CACHE_SIZE = 256
+    
+    @classmethod
+    def static_embed(cls, name, build):
+        """Return the embed created by `build()`, building it only the first time."""
+        embed = cls._static.get(name)
+        if embed is None:
+            embed = cls._static[name] = build()
+        return embed
     
     @staticmethod
     def create_basic_embed(title, description=None, color=0x3498db):
@@ -17,9 +36,31 @@ class EmbedCreator:
         embed.set_footer(text="FzMusic Bot")
         return embed
     
-    @staticmethod
-    def create_now_playing_embed(song, position=0):
+    @classmethod
+    def create_now_playing_embed(cls, song, position=0):
         """Create an embed for the currently playing song."""
+        key = (song.url, song.title, song.requester_id)
+        cached = cls._now_playing.get(key)
+        if cached is None:
+            embed = cls._render_now_playing(song)
+            cached = cls._now_playing[key] = (embed, embed.to_dict())
+            while len(cls._now_playing) > cls.NOW_PLAYING_CACHE_SIZE:
+                cls._now_playing.popitem(last=False)
+        else:
+            cls._now_playing.move_to_end(key)
+        
+        # La posición sale de los frames que realmente se han reproducido
+        if not (song.duration and position):
+            return cached[0]
+        
+        template = cached[1]
+        progress = {"name": "Progress", "value": cls.create_progress_bar(position, song.duration), "inline": False}
+        fields = list(template.get("fields", []))
+        fields.insert(1, progress)
+        return discord.Embed.from_dict({**template, "fields": fields})
+    
+    @staticmethod
+    def _render_now_playing(song):
         embed = discord.Embed(
             title="🎵 Now Playing",
             description=f"[{song.title}]({song.url})",
@@ -27,25 +68,84 @@ class EmbedCreator:
         )
         
         # Add duration information if available
-        if song.duration and song.duration != "Unknown duration":
-            embed.add_field(name="Duration", value=f"`{song.duration}`", inline=True)
-            
-            # We could add a progress bar here, but we don't have accurate position tracking
-            # For now, we'll just show the song duration
+        if song.duration:
+            embed.add_field(name="Duration", value=f"`{song.formatted_duration}`", inline=True)
         
-        embed.add_field(name="Requested by", value=song.requester.mention, inline=True)
+        embed.add_field(name="Requested by", value=song.requester_mention, inline=True)
         
         if song.thumbnail:
             embed.set_thumbnail(url=song.thumbnail)
             
         embed.set_footer(text="FzMusic Bot")
-        embed.timestamp = datetime.datetime.now()
+        return embed
+    
+    @staticmethod
+    def format_time(seconds):
+        """Format seconds as H:MM:SS or M:SS."""
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours > 0:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes}:{seconds:02d}"
+    
+    @staticmethod
+    def create_progress_bar(position, duration, length=20):
+        """Create a text progress bar like `1:23` ▬▬▬🔘▬▬▬ `3:45`."""
+        position = min(max(position, 0), duration)
+        filled = int(length * position / duration)
+        bar = "▬" * filled + "🔘" + "▬" * (length - filled)
+        return f"`{EmbedCreator.format_time(position)}` {bar} `{EmbedCreator.format_time(duration)}`"
+    
+    @classmethod
+    def create_queue_page_embed(cls, queue, page, guild, songs_per_page=10):
+        """Create the embed for a page (0-based) of a guild's queue, current song first.
+
+        Pages are cached until the queue's version changes.
+        """
+        version, pages = cls._queue_pages.get(queue, (None, None))
+        if version != queue.version:
+            pages = {}
+            cls._queue_pages[queue] = (queue.version, pages)
         
+        embed = pages.get(page)
+        if embed is None:
+            embed = pages[page] = cls._render_queue_page(queue, page, guild, songs_per_page)
+        return embed
+    
+    @staticmethod
+    def _render_queue_page(queue, page, guild, songs_per_page):
+        # La canción actual ocupa la primera posición de la lista mostrada
+        offset = 1 if queue.current else 0
+        total = len(queue) + offset
+        pages = max(1, (total + songs_per_page - 1) // songs_per_page)
+        
+        start = page * songs_per_page
+        end = min(start + songs_per_page, total)
+        lines = []
+        if start == 0 and queue.current:
+            song = queue.current
+            lines.append(f"**🔊 Ahora:** {song.title} [{song.formatted_duration}] (pedida por {song.requester_name(guild)})")
+        # Recorrer solo las canciones de esta página, sin copiar toda la cola
+        for position, song in enumerate(queue.page(max(0, start - offset), end - max(start, offset)), start=max(start, offset) + 1 - offset):
+            lines.append(f"**{position}.** {song.title} [{song.formatted_duration}] (pedida por {song.requester_name(guild)})")
+        
+        embed = discord.Embed(
+            title="🎵 Cola de reproducción",
+            description="\n\n".join(lines),
+            color=0x9B59B6  # Color morado
+        )
+        footer = f"Página {page + 1} de {pages} | {total} canción(es) en total"
+        stats = queue.stats()
+        if stats['count']:
+            # Las canciones sin duración conocida no se pueden sumar
+            unknown = "+" if stats['unknown_durations'] else ""
+            footer += f" | En cola: {EmbedCreator.format_time(stats['duration'])}{unknown}"
+        embed.set_footer(text=footer)
         return embed
     
     @staticmethod
     def create_queue_embed(queue, current_page=0, items_per_page=10):
-        """Create an embed for displaying the queue."""
+        """Create an embed for displaying the queue (a MusicQueue)."""
         queue_length = len(queue)
         pages = max(1, math.ceil(queue_length / items_per_page))
         current_page = min(current_page, pages - 1)
@@ -62,10 +162,10 @@ class EmbedCreator:
         if queue_length == 0:
             embed.description = "The queue is empty. Add songs with `fz!play`!"
         else:
-            queue_list = ""
-            for i in range(start_idx, end_idx):
-                song = queue[i]
-                queue_list += f"**{i + 1}.** [{song.title}]({song.url}) | `{song.duration}` | Requested by: {song.requester.mention}\n"
+            queue_list = "".join(
+                f"**{i}.** [{song.title}]({song.url}) | `{song.formatted_duration}` | Requested by: {song.requester_mention}\n"
+                for i, song in enumerate(queue.page(start_idx, end_idx - start_idx), start=start_idx + 1)
+            )
             
             embed.description = f"**{queue_length} songs in queue | Page {current_page + 1}/{pages}**\n\n{queue_list}"
             
@@ -78,9 +178,13 @@ class EmbedCreator:
         embed.timestamp = datetime.datetime.now()
         return embed
     
-    @staticmethod
-    def create_help_embed():
+    @classmethod
+    def create_help_embed(cls):
         """Create an embed for the help command."""
+        return cls.static_embed("help", cls._render_help)
+    
+    @staticmethod
+    def _render_help():
         embed = discord.Embed(
             title="FzMusic Bot Commands",
             description="Here are all available commands:",
@@ -91,7 +195,7 @@ class EmbedCreator:
         embed.add_field(
             name="🎵 Music Commands",
             value=(
-                "`fz!play <url>` - Play a song or add to queue (alias: `fz!p`)\n"
+                "`fz!play <url or search>` - Play a song or add to queue, several separated by `|` (alias: `fz!p`)\n"
                 "`fz!skip` - Skip to the next song (alias: `fz!s`)\n"
                 "`fz!queue` - Show the current queue (alias: `fz!q`, `fz!qu`)\n"
                 "`fz!np` - Show the currently playing song (alias: `fz!nowplaying`)\n"
@@ -116,6 +220,7 @@ class EmbedCreator:
             name="🎚️ Playback Control",
             value=(
                 "`fz!volume <1-100>` - Adjust the volume\n"
+                "`fz!seek <MM:SS>` - Jump to a position in the current song\n"
                 "`fz!stop` - Stop playback and clear the queue\n"
                 "`fz!dc` - Disconnect the bot from voice channel\n"
             ),
@@ -123,6 +228,4 @@ class EmbedCreator:
         )
         
         embed.set_footer(text="FzMusic Bot")
-        embed.timestamp = datetime.datetime.now()
-        
         return embed
\ No newline at end of file
@@ -0,0 +1,184 @@
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from .batched_db import BatchedDatabase
+
+logger = logging.getLogger('extraction_cache')
+
+# Metadata fields kept from a yt-dlp info dict
+CACHED_FIELDS = ('id', 'title', 'duration', 'thumbnail', 'webpage_url')
+
+VIDEO_ID_PATTERNS = [
+    r'(?:youtube\.com/watch\?(?:.*&)?v=)([A-Za-z0-9_-]{11})',
+    r'(?:youtu\.be/)([A-Za-z0-9_-]{11})',
+    r'(?:youtube\.com/(?:shorts|embed|live|v)/)([A-Za-z0-9_-]{11})',
+]
+
+def extract_video_id(url):
+    """Return the canonical YouTube video ID of a URL, or None if it has none."""
+    for pattern in VIDEO_ID_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+def extract_playlist_id(url):
+    """Return the YouTube playlist ID (the `list` parameter) of a URL, or None."""
+    values = parse_qs(urlparse(url).query).get('list')
+    return values[0] if values else None
+
+class ExtractionCache:
+    """LRU cache of yt-dlp metadata keyed by video ID.
+
+    Metadata lives for `metadata_ttl` seconds, while the signed stream URL is
+    only kept until its own expiry. Entries are held in memory and, if
+    `db_path` is given, also in a SQLite database that survives restarts.
+    New entries and last-access updates are written to the database in
+    batches every `flush_interval` seconds, outside the event loop.
+    """
+    def __init__(self, max_entries=1024, metadata_ttl=86400, db_path=None, max_disk_entries=50000,
+                 flush_interval=2.0):
+        self.max_entries = max_entries
+        self.metadata_ttl = metadata_ttl
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()  # video_id -> (cached_at, metadata, stream_url, stream_expires)
+        self._db = None
+        self._disk_writes = 0
+        self._pending_saves = {}  # video_id -> record not written yet
+        self._pending_touches = {}  # video_id -> last access not written yet
+        self.hits = 0
+        self.misses = 0
+
+        if db_path:
+            try:
+                self._db = BatchedDatabase(db_path, (
+                    'CREATE TABLE IF NOT EXISTS entries ('
+                    'video_id TEXT PRIMARY KEY, metadata TEXT NOT NULL, cached_at REAL NOT NULL, '
+                    'stream_url TEXT, stream_expires REAL, last_access REAL NOT NULL)',
+                    'CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)',
+                ), self._collect, self._write, flush_interval=flush_interval)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open extraction cache database {db_path}: {e}")
+                self._db = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, video_id, need_stream=False):
+        """Return the cached info dict for a video ID, or None on a miss.
+
+        The returned dict only contains the stream URL ('url') while it is
+        still valid. With `need_stream`, an entry without a valid stream URL
+        counts as a miss.
+        """
+        now = time.time()
+        record = self._entries.get(video_id)
+        if record is None:
+            record = self._load(video_id)
+            if record is not None:
+                self._store(video_id, record)
+        else:
+            self._entries.move_to_end(video_id)
+            # Las entradas más usadas viven en memoria; sin esto parecerían las más viejas en disco
+            self._touch(video_id, now)
+
+        if record is None or now - record[0] > self.metadata_ttl:
+            self.misses += 1
+            return None
+
+        cached_at, metadata, stream_url, stream_expires = record
+        stream_valid = stream_url and (stream_expires is None or stream_expires > now)
+        if need_stream and not stream_valid:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        data = dict(metadata)
+        if stream_valid:
+            data['url'] = stream_url
+        return data
+
+    def put(self, data, stream_expires=None):
+        """Cache the metadata (and stream URL, if any) of a yt-dlp info dict."""
+        video_id = data.get('id')
+        if not video_id:
+            return
+        metadata = {field: data.get(field) for field in CACHED_FIELDS}
+        record = (time.time(), metadata, data.get('url'), stream_expires)
+        self._store(video_id, record)
+        self._save(video_id, record)
+
+    def _store(self, video_id, record):
+        self._entries[video_id] = record
+        self._entries.move_to_end(video_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, video_id):
+        if self._db is None:
+            return None
+        # Puede que aún no se haya escrito
+        record = self._pending_saves.get(video_id)
+        if record is not None:
+            return record
+        try:
+            row = self._db.reader.execute(
+                'SELECT cached_at, metadata, stream_url, stream_expires FROM entries WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(video_id, time.time())
+            return (row[0], json.loads(row[1]), row[2], row[3])
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error reading extraction cache: {e}")
+            return None
+
+    def _touch(self, video_id, accessed):
+        if self._db is None:
+            return
+        # Se escribe después de los INSERT del mismo lote, así también vale para entradas nuevas
+        self._pending_touches[video_id] = accessed
+        self._db.schedule()
+
+    def _save(self, video_id, record):
+        if self._db is None:
+            return
+        self._pending_saves[video_id] = record
+        self._pending_touches.pop(video_id, None)
+        self._db.schedule()
+
+    def _collect(self):
+        if not self._pending_saves and not self._pending_touches:
+            return None
+        saves = [
+            (video_id, json.dumps(metadata), cached_at, stream_url, stream_expires, cached_at)
+            for video_id, (cached_at, metadata, stream_url, stream_expires) in self._pending_saves.items()
+        ]
+        touches = [(accessed, video_id) for video_id, accessed in self._pending_touches.items()]
+        self._pending_saves = {}
+        self._pending_touches = {}
+        return saves, touches
+
+    def _write(self, db, batch):
+        saves, touches = batch
+        db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)', saves)
+        db.executemany('UPDATE entries SET last_access = ? WHERE video_id = ?', touches)
+        # Evict the least recently used rows once the table grows past its limit
+        previous = self._disk_writes
+        self._disk_writes += len(saves)
+        if self._disk_writes // 100 != previous // 100:
+            db.execute(
+                'DELETE FROM entries WHERE video_id IN ('
+                'SELECT video_id FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (self.max_disk_entries,)
+            )
+
+    def flush(self):
+        """Write every pending change right away (e.g. on shutdown)."""
+        if self._db is not None:
+            self._db.flush()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .metrics import metrics
+
+logger = logging.getLogger('extraction_scheduler')
+
+class ExtractionScheduler:
+    """Runs blocking extraction jobs on a dedicated, bounded executor.
+
+    Pending jobs are queued per guild and dispatched round-robin, with at most
+    `per_guild_limit` jobs of the same guild running at once, so one guild
+    importing a huge playlist can't starve the rest.
+    """
+    def __init__(self, workers=4, per_guild_limit=2, use_processes=False):
+        self.workers = workers
+        self.per_guild_limit = per_guild_limit
+        self.use_processes = use_processes
+        self._executor = None  # Created on the first job, again after a shutdown
+        self._pending = {}  # guild_id -> deque of (future, func, args, enqueued_at)
+        self._ready = deque()  # Guilds with pending jobs, in round-robin order
+        self._running = {}  # guild_id -> number of running jobs
+        self._running_total = 0
+
+        # Metrics
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self):
+        """Number of jobs waiting for a worker."""
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def stats(self):
+        """Return queue depth and wait-time metrics."""
+        return {
+            'queue_depth': self.queue_depth,
+            'running': self._running_total,
+            'guilds_waiting': len(self._ready),
+            'completed': self.completed,
+            'avg_wait': self.total_wait / self.completed if self.completed else 0.0,
+            'max_wait': self.max_wait,
+        }
+
+    async def run(self, guild_id, func, *args):
+        """Queue `func(*args)` for `guild_id` and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        if guild_id not in self._pending:
+            self._pending[guild_id] = deque()
+        if not self._pending[guild_id] and guild_id not in self._ready:
+            self._ready.append(guild_id)
+        self._pending[guild_id].append((future, func, args, time.monotonic()))
+
+        self._dispatch(loop)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # El llamador se fue: que el trabajo deje de contar como pendiente
+            self._discard(guild_id, future)
+            raise
+
+    def _discard(self, guild_id, future):
+        jobs = self._pending.get(guild_id)
+        if not jobs:
+            return
+        for job in jobs:
+            if job[0] is future:
+                jobs.remove(job)
+                break
+        if not jobs:
+            del self._pending[guild_id]
+            if guild_id in self._ready:
+                self._ready.remove(guild_id)
+
+    def shutdown(self):
+        """Stop the executor, cancelling the jobs that haven't started.
+
+        A later job starts a new executor, so the scheduler survives a cog reload.
+        """
+        for jobs in self._pending.values():
+            for future, _, _, _ in jobs:
+                future.cancel()
+        self._pending.clear()
+        self._ready.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _create_executor(self):
+        if self.use_processes:
+            # Jobs must then be picklable module-level functions. spawn, because fork
+            # in a process that already runs threads (audio, executors) can deadlock
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='extraction')
+
+    def _dispatch(self, loop):
+        # Recorrer los gremios en orden round-robin mientras haya workers libres
+        skipped = 0
+        while self._running_total < self.workers and self._ready and skipped < len(self._ready):
+            guild_id = self._ready.popleft()
+            jobs = self._pending[guild_id]
+
+            # Descartar trabajos cuyo llamador ya no espera
+            while jobs and jobs[0][0].done():
+                jobs.popleft()
+            if not jobs:
+                del self._pending[guild_id]
+                continue
+
+            if self._running.get(guild_id, 0) >= self.per_guild_limit:
+                self._ready.append(guild_id)
+                skipped += 1
+                continue
+
+            future, func, args, enqueued_at = jobs.popleft()
+            if jobs:
+                self._ready.append(guild_id)
+            else:
+                del self._pending[guild_id]
+            skipped = 0
+
+            wait = time.monotonic() - enqueued_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            metrics.observe('fzmusic_extraction_wait_seconds', wait,
+                            'Time extraction jobs waited in the scheduler for a worker')
+
+            self._running[guild_id] = self._running.get(guild_id, 0) + 1
+            self._running_total += 1
+            if self._executor is None:
+                self._executor = self._create_executor()
+            job = loop.run_in_executor(self._executor, func, *args)
+            job.add_done_callback(lambda job, guild_id=guild_id, future=future: self._finished(loop, guild_id, future, job))
+
+    def _finished(self, loop, guild_id, future, job):
+        self._running[guild_id] -= 1
+        if not self._running[guild_id]:
+            del self._running[guild_id]
+        self._running_total -= 1
+        self.completed += 1
+
+        if not future.done():
+            if job.cancelled():
+                future.cancel()
+            elif job.exception() is not None:
+                future.set_exception(job.exception())
+            else:
+                future.set_result(job.result())
+
+        self._dispatch(loop)
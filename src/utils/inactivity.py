@@ -0,0 +1,79 @@
+import asyncio
+import heapq
+import logging
+
+logger = logging.getLogger('inactivity')
+
+class InactivityTracker:
+    """Calls `on_expire(guild_id)` once a guild has been inactive for `timeout` seconds.
+
+    Deadlines are kept in a heap, so the single sweeper task only wakes up
+    when the earliest deadline is due and only touches the guilds that expired.
+    Outdated heap entries (the guild was touched again) are skipped lazily.
+    """
+    def __init__(self, timeout, on_expire):
+        self.timeout = timeout
+        self.on_expire = on_expire
+        self._deadlines = {}  # guild_id -> current deadline
+        self._heap = []  # (deadline, guild_id), may contain outdated entries
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def touch(self, guild_id):
+        """Push back the deadline of a guild."""
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.timeout
+        self._deadlines[guild_id] = deadline
+        heapq.heappush(self._heap, (deadline, guild_id))
+
+        # Compactar el heap si acumula demasiadas entradas obsoletas
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, g) for g, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        elif self._heap[0][1] == guild_id:
+            self._wakeup.set()
+
+    def forget(self, guild_id):
+        """Stop tracking a guild."""
+        self._deadlines.pop(guild_id, None)
+
+    def stop(self):
+        """Stop the sweeper task."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            deadline, guild_id = self._heap[0]
+            if self._deadlines.get(guild_id) != deadline:
+                heapq.heappop(self._heap)
+                continue
+
+            delay = deadline - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            del self._deadlines[guild_id]
+            try:
+                await self.on_expire(guild_id)
+            except Exception as e:
+                logger.error(f"Error handling inactivity of guild {guild_id}: {e}")
@@ -0,0 +1,138 @@
+import random
+from collections import deque
+from itertools import islice
+
+class IndexedQueue:
+    """Sequence stored as a list of small deques ("blocks").
+
+    Appending and popping from the front are O(1); indexing, positional
+    insertion and removal only need to walk the block sizes, which is
+    O(n / BLOCK_SIZE) plus O(BLOCK_SIZE) inside the block. This keeps huge
+    queues (thousands of songs after a playlist import) cheap to consume.
+    """
+    BLOCK_SIZE = 256
+
+    def __init__(self, items=()):
+        self._blocks = []
+        self._len = 0
+        self.extend(items)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def __repr__(self):
+        return f"IndexedQueue({len(self)} items)"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            return list(self.iter_range(start, stop))
+        block, offset = self._locate(index)
+        return self._blocks[block][offset]
+
+    def __setitem__(self, index, value):
+        block, offset = self._locate(index)
+        self._blocks[block][offset] = value
+
+    def _locate(self, index):
+        """Return (block index, offset in block) of a position."""
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("IndexedQueue index out of range")
+        for i, block in enumerate(self._blocks):
+            if index < len(block):
+                return i, index
+            index -= len(block)
+        raise IndexError("IndexedQueue index out of range")
+
+    def iter_range(self, start, stop):
+        """Iterate over positions [start, stop) without copying the queue."""
+        start = max(0, start)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return
+        block, offset = self._locate(start)
+        remaining = stop - start
+        # Recorrer por índice para no copiar la lista de bloques
+        for i in range(block, len(self._blocks)):
+            for item in islice(self._blocks[i], offset, None):
+                yield item
+                remaining -= 1
+                if not remaining:
+                    return
+            offset = 0
+
+    def append(self, item):
+        if not self._blocks or len(self._blocks[-1]) >= self.BLOCK_SIZE:
+            self._blocks.append(deque())
+        self._blocks[-1].append(item)
+        self._len += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def popleft(self):
+        if not self._len:
+            raise IndexError("pop from an empty IndexedQueue")
+        block = self._blocks[0]
+        item = block.popleft()
+        if not block:
+            self._blocks.pop(0)
+        self._len -= 1
+        return item
+
+    def pop(self, index=-1):
+        block, offset = self._locate(index)
+        current = self._blocks[block]
+        if offset == 0:
+            item = current.popleft()
+        else:
+            item = current[offset]
+            del current[offset]
+        if not current:
+            del self._blocks[block]
+        elif block > 0 and len(current) + len(self._blocks[block - 1]) <= self.BLOCK_SIZE:
+            # Unir bloques pequeños para que el número de bloques no crezca con los borrados
+            self._blocks[block - 1].extend(current)
+            del self._blocks[block]
+        self._len -= 1
+        return item
+
+    def insert(self, index, item):
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            self.append(item)
+            return
+        block, offset = self._locate(index)
+        current = self._blocks[block]
+        current.insert(offset, item)
+        self._len += 1
+
+        # Partir los bloques que crecen demasiado para mantener las inserciones baratas
+        if len(current) > 2 * self.BLOCK_SIZE:
+            tail = deque()
+            for _ in range(len(current) // 2):
+                tail.appendleft(current.pop())
+            self._blocks.insert(block + 1, tail)
+
+    def clear(self):
+        self._blocks = []
+        self._len = 0
+
+    def shuffle(self):
+        items = list(self)
+        random.shuffle(items)
+        self.clear()
+        self.extend(items)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger('message_dispatcher')
+
+# Discord allows about 5 messages every 5 seconds per channel
+CHANNEL_RATE = 5
+CHANNEL_PER = 5.0
+MAX_MESSAGE_LENGTH = 2000
+# Channels with nothing sent for this long are forgotten (with their editable status messages)
+IDLE_OUTBOX_SECONDS = 900
+
+class _Message:
+    __slots__ = ('content', 'embed', 'key', 'edit', 'futures')
+
+    def __init__(self, content, embed, key, edit, future):
+        self.content = content
+        self.embed = embed
+        self.key = key
+        self.edit = edit
+        self.futures = [future]
+
+class _Outbox:
+    """Pending messages of one channel, sent by a task that exits when idle."""
+    # Status messages remembered per channel so they can be edited later
+    MAX_STATUS = 32
+
+    def __init__(self, channel, rate, per):
+        self.channel = channel
+        self.rate = rate
+        self.per = per
+        self.pending = deque()
+        self.status = OrderedDict()  # key -> ID of the last message sent with that key
+        self.task = None
+        self.last_used = None  # Loop time of the last message queued or sent
+        self._tokens = rate
+        self._updated = None
+
+    def put(self, message):
+        # Un mensaje pendiente con la misma clave queda obsoleto: se reemplaza sin enviarlo
+        if message.key is not None:
+            for queued in self.pending:
+                if queued.key == message.key:
+                    queued.content = message.content
+                    queued.embed = message.embed
+                    queued.edit = message.edit
+                    queued.futures.extend(message.futures)
+                    return
+
+        # Juntar textos simples consecutivos en un único mensaje
+        last = self.pending[-1] if self.pending else None
+        if (message.key is None and message.embed is None and message.content
+                and last is not None and last.key is None and last.embed is None and last.content
+                and len(last.content) + len(message.content) + 1 <= MAX_MESSAGE_LENGTH):
+            last.content = f"{last.content}\n{message.content}"
+            last.futures.extend(message.futures)
+            return
+
+        self.pending.append(message)
+
+    async def _acquire(self):
+        """Wait for a token of the channel's bucket before touching the channel."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._updated is not None:
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    def _editable(self, message):
+        previous_id = self.status.get(message.key)
+        if previous_id is None or message.edit is None:
+            return None
+        if message.edit == 'last' and getattr(self.channel, 'last_message_id', None) != previous_id:
+            return None
+        # Solo se guarda el ID; el mensaje parcial basta para editarlo
+        return self.channel.get_partial_message(previous_id)
+
+    async def run(self):
+        while self.pending:
+            await self._acquire()
+            message = self.pending.popleft()
+            result = None
+            try:
+                previous = self._editable(message)
+                if previous is not None:
+                    result = await previous.edit(content=message.content, embed=message.embed)
+                else:
+                    result = await self.channel.send(content=message.content, embed=message.embed)
+                if message.key is not None:
+                    self.status[message.key] = result.id
+                    self.status.move_to_end(message.key)
+                    while len(self.status) > self.MAX_STATUS:
+                        self.status.popitem(last=False)
+            except Exception as e:
+                logger.error(f"Error sending message to channel {self.channel.id}: {e}")
+            for future in message.futures:
+                if not future.done():
+                    future.set_result(result)
+        self.last_used = asyncio.get_running_loop().time()
+
+class MessageDispatcher:
+    """Outbound message queue per channel.
+
+    Messages are sent by one task per channel that waits for a token of a
+    bucket matching Discord's per-channel limit, so bursts never reach a 429.
+    While a message waits, consecutive plain texts are joined together and a
+    newer message with the same `key` replaces the queued one. A message with
+    a `key` can also edit the previous one sent with that key instead of
+    posting a new one: always (`edit='always'`) or only while it is still the
+    latest message of the channel (`edit='last'`).
+
+    `send` returns a future with the sent (or edited) discord.Message, or
+    None if it failed. Callers that don't need it can ignore it. Only message
+    IDs are kept for later edits, and channels idle for a while are forgotten.
+    """
+    def __init__(self, rate=CHANNEL_RATE, per=CHANNEL_PER):
+        self.rate = rate
+        self.per = per
+        self._outboxes = {}  # channel ID -> _Outbox
+        self._last_prune = None
+
+    def send(self, channel, content=None, *, embed=None, key=None, edit='last'):
+        """Queue a message for `channel`."""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._prune(loop.time())
+        outbox = self._outboxes.get(channel.id)
+        if outbox is None:
+            outbox = self._outboxes[channel.id] = _Outbox(channel, self.rate, self.per)
+        outbox.channel = channel
+        outbox.last_used = loop.time()
+        outbox.put(_Message(content, embed, key, edit if key is not None else None, future))
+
+        if outbox.task is None or outbox.task.done():
+            outbox.task = loop.create_task(outbox.run())
+        return future
+
+    def _prune(self, now):
+        """Forget the outboxes of channels idle for IDLE_OUTBOX_SECONDS, checking at most once a minute."""
+        if self._last_prune is not None and now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for channel_id, outbox in list(self._outboxes.items()):
+            idle = outbox.task is None or outbox.task.done()
+            if idle and now - outbox.last_used > IDLE_OUTBOX_SECONDS:
+                del self._outboxes[channel_id]
+
+    def close(self):
+        """Stop every channel task and drop the pending messages."""
+        for outbox in self._outboxes.values():
+            if outbox.task:
+                outbox.task.cancel()
+            for message in outbox.pending:
+                for future in message.futures:
+                    if not future.done():
+                        future.set_result(None)
+        self._outboxes.clear()
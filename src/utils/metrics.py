@@ -0,0 +1,175 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from ..config.settings import METRICS_ENABLED
+
+logger = logging.getLogger('metrics')
+
+# Upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Cumulative histogram in the Prometheus style."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """Process-wide counters, histograms and gauges, rendered in Prometheus text format.
+
+    When disabled, `timer` returns a shared no-op context manager and the
+    other calls return right away, so instrumented code pays almost nothing.
+    Gauges (and counters kept elsewhere, like cache hits) are registered as
+    callbacks and only evaluated when the metrics are rendered.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._help = {}  # name -> (type, help)
+        self._counters = {}
+        self._histograms = {}
+        self._callbacks = {}  # name -> function returning the current value
+        self._lag_task = None
+
+    def _describe(self, name, kind, help_text):
+        if name not in self._help:
+            self._help[name] = (kind, help_text)
+
+    def inc(self, name, value=1, help_text=''):
+        """Increase a counter."""
+        if not self.enabled:
+            return
+        self._describe(name, 'counter', help_text)
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value, help_text=''):
+        """Record a value (in seconds) in a histogram."""
+        if not self.enabled:
+            return
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            self._describe(name, 'histogram', help_text)
+            histogram = self._histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def timer(self, name, help_text=''):
+        """Context manager that records the time spent inside it in a histogram."""
+        if not self.enabled:
+            return NULL_TIMER
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            self._describe(name, 'histogram', help_text)
+            histogram = self._histograms[name] = Histogram()
+        return _Timer(histogram)
+
+    def register(self, name, func, kind='gauge', help_text=''):
+        """Expose the value returned by `func()` each time the metrics are rendered."""
+        if not self.enabled:
+            return
+        self._describe(name, kind, help_text)
+        self._callbacks[name] = func
+
+    def start_loop_lag_sampler(self, interval=0.5):
+        """Sample how late the event loop wakes up from a sleep, every `interval` seconds."""
+        if not self.enabled or (self._lag_task and not self._lag_task.done()):
+            return
+        self._lag_task = asyncio.get_event_loop().create_task(self._sample_loop_lag(interval))
+
+    def stop_loop_lag_sampler(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    async def _sample_loop_lag(self, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.observe('fzmusic_event_loop_lag_seconds', max(0.0, loop.time() - started - interval),
+                         'Delay of the event loop waking up from a sleep')
+
+    def render(self):
+        """Return every metric in Prometheus text exposition format."""
+        lines = []
+        for name, (kind, help_text) in sorted(self._help.items()):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            if name in self._histograms:
+                histogram = self._histograms[name]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum {histogram.sum}")
+                lines.append(f"{name}_count {histogram.count}")
+            elif name in self._counters:
+                lines.append(f"{name} {self._counters[name]}")
+            elif name in self._callbacks:
+                try:
+                    lines.append(f"{name} {self._callbacks[name]()}")
+                except Exception as e:
+                    logger.error(f"Error reading metric {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+def count_ffmpeg_processes():
+    """Count the ffmpeg processes started by this process (Linux only, 0 elsewhere)."""
+    pid = str(os.getpid())
+    count = 0
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                # pid (comm) state ppid ...
+                stat = file.read()
+        except OSError:
+            continue
+        comm_end = stat.rfind(')')
+        fields = stat[comm_end + 2:].split()
+        if fields and fields[1] == pid and stat[stat.find('(') + 1:comm_end] == 'ffmpeg':
+            count += 1
+    return count
+
+# Shared by the whole process
+metrics = Metrics(enabled=METRICS_ENABLED)
+metrics.register('fzmusic_ffmpeg_processes', count_ffmpeg_processes, help_text='Running ffmpeg processes')
@@ -1,35 +1,122 @@
 import asyncio
-import random
 from async_timeout import timeout
 from discord.ext import commands
+from .player import GuildPlayer
+from .indexed_queue import IndexedQueue
+from .extraction_cache import extract_video_id
+from .youtube_dl import YTDLSource, extraction_cache, extraction_scheduler
+from .inactivity import InactivityTracker
+from .message_dispatcher import MessageDispatcher
+from .queue_store import QueueStore
+from .metrics import metrics
+from ..config.settings import QUEUE_STATE_DB
 
 class Song:
-    """Class representing a song."""
-    def __init__(self, source, title, duration, url, thumbnail, requester):
-        self.source = source
+    """Class representing a song.
+
+    Only compact metadata is stored: the duration in seconds, the YouTube
+    video ID instead of full URLs and the requester's user ID, which is
+    resolved to a member only when rendering. The audio source is created
+    just before the song is played.
+    """
+    __slots__ = ('title', 'duration', 'video_id', '_url', '_thumbnail', 'requester_id', 'stream_url', 'prepared_source')
+    
+    def __init__(self, title, duration, url, thumbnail, requester_id, stream_url=None):
         self.title = title
-        self.duration = duration
-        self.url = url
-        self.thumbnail = thumbnail
-        self.requester = requester
+        self.duration = int(duration) if duration else None  # Seconds
+        self.video_id = extract_video_id(url) if url else None
+        # Las URLs completas solo se guardan si no se pueden reconstruir desde el ID
+        self._url = None if self.video_id else url
+        self._thumbnail = None if self.video_id else thumbnail
+        self.requester_id = requester_id
+        self.stream_url = stream_url  # Direct (signed) stream URL, may expire
+        self.prepared_source = None  # ffmpeg source opened ahead of time by the prefetcher
+    
+    @property
+    def url(self):
+        """Webpage URL of the song."""
+        if self.video_id:
+            return f"https://www.youtube.com/watch?v={self.video_id}"
+        return self._url
+    
+    @property
+    def thumbnail(self):
+        """Thumbnail URL of the song, if known."""
+        if self.video_id:
+            return f"https://i.ytimg.com/vi/{self.video_id}/hqdefault.jpg"
+        return self._thumbnail
+    
+    @property
+    def formatted_duration(self):
+        """Duration as H:MM:SS or M:SS."""
+        return YTDLSource.parse_duration(self.duration)
+    
+    @property
+    def requester_mention(self):
+        """Mention of the user who requested the song."""
+        return f"<@{self.requester_id}>"
+    
+    def requester_name(self, guild):
+        """Display name of the requester in `guild`, looked up when needed."""
+        member = guild.get_member(self.requester_id) if guild else None
+        # Sin el intent de miembros solo están en caché los que siguen en voz; la mención se resuelve sola
+        return member.display_name if member else self.requester_mention
         
     def __str__(self):
-        return f"{self.title} ({self.duration})"
+        return f"{self.title} ({self.formatted_duration})"
+    
+    def to_record(self):
+        """Compact list with the song's metadata, for persisting it."""
+        return [self.title, self.duration, self.url, self._thumbnail, self.requester_id]
+    
+    @classmethod
+    def from_record(cls, record):
+        """Rebuild a song saved with `to_record`."""
+        title, duration, url, thumbnail, requester_id = record
+        return cls(title, duration, url, thumbnail, requester_id)
 
 class MusicQueue:
     """Class to manage the music queue for a server."""
-    def __init__(self, bot):
+    def __init__(self, bot, guild_id=None, on_activity=None, on_change=None):
         self.bot = bot
-        self.queue = []
-        self.current = None
+        self.guild_id = guild_id
+        self.on_activity = on_activity  # Called with the guild ID on every activity update
+        self.on_change = on_change  # Called with the queue after every change
+        self.queue = IndexedQueue()
+        self._current = None
+        self.version = 0  # Bumped on every change, used to invalidate rendered queue pages
+        self.songs_version = 0  # Bumped only when the queued songs change
+        # Aggregates of the queued songs, kept up to date on every change
+        self.total_duration = 0  # Seconds, songs with unknown duration count as 0
+        self.unknown_durations = 0
         self.loop = False
-        self.volume = 0.5  # Default volume (0.5 = 50%)
+        self._volume = 0.5  # Default volume (0.5 = 50%)
         self.last_activity = None
         self._cog = None
     
     def __len__(self):
         return len(self.queue)
     
+    @property
+    def current(self):
+        """Song being played."""
+        return self._current
+    
+    @current.setter
+    def current(self, song):
+        self._current = song
+        self._changed(songs=False)
+    
+    @property
+    def volume(self):
+        """Playback volume (0.0-1.0)."""
+        return self._volume
+    
+    @volume.setter
+    def volume(self, volume):
+        self._volume = volume
+        self._changed(songs=False)
+    
     @property
     def is_empty(self):
         """Return True if queue is empty."""
@@ -38,19 +125,31 @@ class MusicQueue:
     def clear(self):
         """Clear the queue."""
         self.queue.clear()
+        self.total_duration = 0
+        self.unknown_durations = 0
+        self._changed()
     
     def shuffle(self):
         """Shuffle the queue."""
-        random.shuffle(self.queue)
+        self.queue.shuffle()
+        self._changed()
     
     def add(self, song):
         """Add a song to the queue."""
         self.queue.append(song)
+        self._count(song, 1)
+    
+    def insert(self, index, song):
+        """Insert a song at a specific index."""
+        self.queue.insert(index, song)
+        self._count(song, 1)
     
     def remove(self, index):
         """Remove a song at a specific index."""
         if 0 <= index < len(self.queue):
-            return self.queue.pop(index)
+            song = self.queue.pop(index)
+            self._count(song, -1)
+            return song
         return None
     
     def get_next(self):
@@ -58,11 +157,68 @@ class MusicQueue:
         if not self.queue:
             return None
         # Retorna y elimina la primera canción de la cola
-        return self.queue.pop(0)
+        song = self.queue.popleft()
+        self._count(song, -1)
+        return song
+    
+    def _count(self, song, sign):
+        """Add (sign=1) or subtract (sign=-1) a song from the aggregates."""
+        if song.duration:
+            self.total_duration += sign * song.duration
+        else:
+            self.unknown_durations += sign
+        self._changed()
+    
+    def _changed(self, songs=True):
+        self.version += 1
+        if songs:
+            self.songs_version += 1
+        if self.on_change:
+            self.on_change(self)
+    
+    def page(self, start, count):
+        """Lazily iterate over `count` queued songs from position `start`, without copying."""
+        return self.queue.iter_range(start, start + count)
+    
+    def stats(self):
+        """Aggregates of the queued songs, in O(1)."""
+        return {
+            'count': len(self.queue),
+            'duration': self.total_duration,
+            'unknown_durations': self.unknown_durations,
+        }
+    
+    def snapshot(self, include_songs=True):
+        """State of the queue to persist, or None if there's nothing to keep.
+
+        'songs' is a shallow copy of the queued Song objects (their saved fields
+        never change), so they can be turned into records outside the event
+        loop. With `include_songs=False` it is left out.
+        """
+        if self._current is None and not self.queue:
+            return None
+        state = {
+            'current': self._current.to_record() if self._current else None,
+            'volume': self._volume,
+        }
+        if include_songs:
+            state['songs'] = list(self.queue)
+        return state
+    
+    def restore(self, state):
+        """Load a state saved with `snapshot`. The song that was playing goes first."""
+        records = state.get('songs', [])
+        if state.get('current'):
+            records = [state['current']] + records
+        for record in records:
+            self.add(Song.from_record(record))
+        self.volume = state.get('volume', self._volume)
     
     def update_activity(self):
         """Update the last activity timestamp."""
         self.last_activity = asyncio.get_event_loop().time()
+        if self.on_activity:
+            self.on_activity(self.guild_id)
 
 class GuildMusicState:
     """Class to manage music state across multiple guilds."""
@@ -70,27 +226,77 @@ class GuildMusicState:
         self.bot = bot
         self.voice_clients = {}
         self.queues = {}
+        self.players = {}
         self.inactivity_timeout = 300  # 5 minutes in seconds
+        self.inactivity = InactivityTracker(self.inactivity_timeout, self.handle_inactivity)
+        self.dispatcher = MessageDispatcher()
+        self.store = QueueStore(QUEUE_STATE_DB)
+        
+        metrics.register('fzmusic_voice_clients', lambda: len(self.bot.voice_clients), help_text='Connected voice clients')
+        metrics.register('fzmusic_guild_players', lambda: len(self.players), help_text='Guilds with a player task')
+        metrics.register('fzmusic_queued_songs', lambda: sum(len(queue) for queue in self.queues.values()),
+                         help_text='Songs waiting in every queue')
+        metrics.start_loop_lag_sampler()
         
     def get_queue(self, guild_id):
         """Get or create a queue for a guild."""
         if guild_id not in self.queues:
-            self.queues[guild_id] = MusicQueue(self.bot)
+            queue = MusicQueue(self.bot, guild_id, on_activity=self.inactivity.touch)
+            # La cola guardada antes de un reinicio se carga la primera vez que se usa el servidor
+            state = self.store.load(guild_id)
+            if state:
+                queue.restore(state)
+            queue.on_change = self.store.mark_dirty
+            self.queues[guild_id] = queue
+            self.inactivity.touch(guild_id)
         return self.queues[guild_id]
     
-    async def check_inactivity(self):
-        """Check for voice client inactivity and disconnect if necessary."""
-        while True:
-            await asyncio.sleep(60)  # Check every minute
-            current_time = asyncio.get_event_loop().time()
-            
-            for guild_id, queue in list(self.queues.items()):
-                if guild_id in self.voice_clients and queue.last_activity:
-                    if current_time - queue.last_activity > self.inactivity_timeout:
-                        voice_client = self.voice_clients[guild_id]
-                        if voice_client.is_connected():
-                            await voice_client.disconnect()
-                            if guild_id in self.queues:
-                                del self.queues[guild_id]
-                            if guild_id in self.voice_clients:
-                                del self.voice_clients[guild_id]
\ No newline at end of file
+    def remove_queue(self, guild_id):
+        """Forget the queue of a guild."""
+        self.queues.pop(guild_id, None)
+        self.inactivity.forget(guild_id)
+    
+    def get_player(self, guild_id):
+        """Get or create the player task for a guild."""
+        player = self.players.get(guild_id)
+        if player is None or player.closed:
+            player = GuildPlayer(self.bot, guild_id, self.get_queue(guild_id), self.dispatcher)
+            self.players[guild_id] = player
+        return player
+    
+    def remove_player(self, guild_id):
+        """Stop and forget the player of a guild."""
+        player = self.players.pop(guild_id, None)
+        if player:
+            player.close()
+    
+    def close(self):
+        """Stop every player, the inactivity tracker, the message dispatcher and the extraction executor."""
+        for guild_id in list(self.players):
+            self.remove_player(guild_id)
+        self.inactivity.stop()
+        self.dispatcher.close()
+        self.store.flush()
+        extraction_cache.flush()
+        extraction_scheduler.shutdown()
+        metrics.stop_loop_lag_sampler()
+    
+    async def handle_inactivity(self, guild_id):
+        """Disconnect an inactive guild and free its state."""
+        guild = self.bot.get_guild(guild_id)
+        voice_client = guild.voice_client if guild else self.voice_clients.get(guild_id)
+        
+        # Una canción sonando no es inactividad, volver a comprobar más tarde
+        if voice_client and voice_client.is_connected() and voice_client.is_playing():
+            self.inactivity.touch(guild_id)
+            return
+        
+        player = self.players.get(guild_id)
+        if player and not player.closed:
+            await player.submit('disconnect')
+        elif voice_client and voice_client.is_connected():
+            await voice_client.disconnect()
+        
+        self.remove_player(guild_id)
+        self.remove_queue(guild_id)
+        self.voice_clients.pop(guild_id, None)
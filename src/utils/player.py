@@ -0,0 +1,375 @@
+import asyncio
+import logging
+import time
+from .audio_sources import CrossfadeSource, TrackedSource
+from .embed_creator import EmbedCreator
+from .metrics import metrics
+from .prefetcher import Prefetcher
+from .youtube_dl import YTDLSource
+from ..config.settings import AUDIO_ENGINE, CROSSFADE_SECONDS, PREOPEN_SECONDS
+
+# Seconds of the next song read ahead before a crossfade starts
+CROSSFADE_PREROLL_SECONDS = 3
+
+logger = logging.getLogger('player')
+
+class GuildPlayer:
+    """Long-lived task that owns the playback state of a single guild.
+
+    Commands are posted to its inbox and applied one at a time, so they never
+    interleave with each other or with song transitions.
+    """
+    def __init__(self, bot, guild_id, queue, dispatcher):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.queue = queue
+        self.dispatcher = dispatcher
+        self.crossfade = CROSSFADE_SECONDS
+        # El crossfade mezcla PCM, así que necesita el motor 'pcm'
+        self.engine = 'pcm' if self.crossfade else AUDIO_ENGINE
+        self.prefetcher = Prefetcher(
+            bot, guild_id, queue,
+            preopen_seconds=max(PREOPEN_SECONDS, self.crossfade + CROSSFADE_PREROLL_SECONDS) if self.crossfade else PREOPEN_SECONDS,
+            engine=self.engine,
+            on_prepared=lambda song: self.post('next_prepared', song)
+        )
+        self.channel = None  # Text channel where playback messages are sent
+        self.inbox = asyncio.Queue()
+        self.closed = False
+        self._source = None  # Source being played, used to ignore stale 'finished' events
+        # perf_counter() marks for the time-to-first-audio and gap-between-tracks metrics
+        self._requested_at = None
+        self._ended_at = None
+        self._task = bot.loop.create_task(self._run())
+
+    @property
+    def voice_client(self):
+        guild = self.bot.get_guild(self.guild_id)
+        return guild.voice_client if guild else None
+
+    @property
+    def position(self):
+        """Seconds of the current song played so far."""
+        return getattr(self._source, 'position', 0)
+
+    def submit(self, command, *args):
+        """Post a command to the inbox and return a future with its result.
+
+        The result is None if the player closed before handling the command.
+        """
+        future = self.bot.loop.create_future()
+        if self.closed:
+            future.set_result(None)
+        else:
+            self.inbox.put_nowait((command, args, future))
+        return future
+
+    def post(self, command, *args):
+        """Post a command without waiting for its result."""
+        if not self.closed:
+            self.inbox.put_nowait((command, args, None))
+
+    def close(self):
+        """Stop the player task."""
+        self.closed = True
+        self._task.cancel()
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                command, args, future = await self.inbox.get()
+                try:
+                    result = await getattr(self, f'_handle_{command}')(*args)
+                except Exception as e:
+                    logger.error(f"Error handling '{command}' in guild {self.guild_id}: {e}")
+                    if future and not future.done():
+                        future.set_exception(e)
+                else:
+                    if future and not future.done():
+                        future.set_result(result)
+        finally:
+            self.closed = True
+            self.prefetcher.stop()
+            # Responder a los comandos que quedaron sin procesar
+            while not self.inbox.empty():
+                _, _, future = self.inbox.get_nowait()
+                if future and not future.done():
+                    future.set_result(None)
+
+    async def send(self, content=None, *, embed=None, key=None):
+        """Queue a message for the guild's command channel.
+
+        Returns a future with the sent message, which the player doesn't wait
+        for so rate limits never hold up playback.
+        """
+        channel = self.channel
+        guild = self.bot.get_guild(self.guild_id)
+        if guild is None:
+            return None
+
+        # Si el canal registrado ya no sirve, buscar cualquiera como fallback
+        if channel is None or not channel.permissions_for(guild.me).send_messages:
+            channel = next((c for c in guild.text_channels if c.permissions_for(guild.me).send_messages), None)
+        if channel is None:
+            return None
+
+        return self.dispatcher.send(channel, content, embed=embed, key=key)
+
+    async def _play_next(self):
+        """Play the next song in the queue."""
+        with metrics.timer('fzmusic_play_next_seconds', 'Time to start the next song of the queue'):
+            await self._play_next_song()
+
+    async def _play_next_song(self):
+        voice_client = self.voice_client
+        if not voice_client or not voice_client.is_connected():
+            logger.info("Voice client disconnected, not playing next song")
+            return
+
+        self.queue.update_activity()
+        old_song = self.queue.current
+
+        while True:
+            song = self.queue.get_next()
+
+            # Si no hay más canciones, el reproductor sigue vivo para los comandos que
+            # lleguen; la desconexión queda en manos del InactivityTracker
+            if not song:
+                self.queue.current = None
+                await self.send("Queue is empty. Stopping playback.")
+                return
+
+            self.queue.current = song
+            try:
+                # Crear el pipeline de ffmpeg justo antes de reproducir
+                source = await self._create_source(song)
+            except Exception as e:
+                logger.error(f"Error creating source for {song.title}: {e}")
+                source = None
+
+            # Verificar de nuevo, la resolución del stream puede haber tardado
+            voice_client = self.voice_client
+            if not voice_client or not voice_client.is_connected():
+                logger.info("Voice client disconnected before playing")
+                if source:
+                    source.cleanup()
+                return
+
+            if source:
+                break
+            await self.send(f"Error playing **{song.title}**. Skipping...")
+
+        self._start(voice_client, song, source)
+        YTDLSource.cache_song(song.video_id, song.stream_url, song.duration)
+
+        # Solo enviar el embed si la canción cambió
+        if old_song != song:
+            await self.send(embed=EmbedCreator.create_now_playing_embed(song), key='now_playing')
+
+    def _start(self, voice_client, song, source, start=0):
+        """Play `source`, the audio of `song` from `start` seconds on."""
+        if self.crossfade:
+            # Un único source mezcla esta canción con las siguientes sin huecos
+            source = CrossfadeSource(source, song.duration, self.crossfade, tag=song,
+                                     preroll_seconds=CROSSFADE_PREROLL_SECONDS, start=start)
+            source.on_advance = lambda tag, mixer=source: self.bot.loop.call_soon_threadsafe(
+                self.post, 'track_advanced', mixer, tag)
+        else:
+            source = TrackedSource(source, start, on_first_frame=self._first_frame_callback() if metrics.enabled else None)
+
+        self._source = source
+        voice_client.play(
+            source,
+            after=lambda _, source=source: self.bot.loop.call_soon_threadsafe(
+                self.post, 'track_finished', source, time.perf_counter())
+        )
+
+        # Empezar a preparar las siguientes canciones mientras suena esta
+        self.prefetcher.track_started(song, self.queue.volume, elapsed=start)
+
+    def _first_frame_callback(self):
+        """Build the callback that records when the audio of the next source starts."""
+        requested_at, ended_at = self._requested_at, self._ended_at
+        self._requested_at = self._ended_at = None
+
+        def on_first_frame():
+            # Se ejecuta en el hilo de audio
+            now = time.perf_counter()
+            if requested_at is not None:
+                metrics.observe('fzmusic_time_to_first_audio_seconds', now - requested_at,
+                                'Time from queueing a song on an idle player to its first audio frame')
+            if ended_at is not None:
+                metrics.observe('fzmusic_track_gap_seconds', now - ended_at,
+                                'Silence between the end of a song and the first frame of the next one')
+        return on_first_frame
+
+    async def _create_source(self, song, start=0):
+        """Create the audio source for a song, re-resolving its stream URL if stale."""
+        # Usar el pipe de ffmpeg que el prefetcher ya dejó abierto, si existe
+        source = self.prefetcher.take_prepared(song) if not start else None
+        if source:
+            return source
+
+        source = YTDLSource.create_cached_source(song.video_id, volume=self.queue.volume, engine=self.engine, start=start)
+        if source:
+            return source
+
+        if YTDLSource.is_stream_stale(song.stream_url):
+            logger.info(f"Stream URL for {song.title} is stale, re-resolving")
+            stream_url = await YTDLSource.refresh_stream_url(song.url, loop=self.bot.loop, guild_id=self.guild_id)
+            if not stream_url:
+                return None
+            song.stream_url = stream_url
+
+        return YTDLSource.create_source(song.stream_url, volume=self.queue.volume, engine=self.engine, start=start)
+
+    def _check_crossfade(self):
+        """Drop the song handed to the crossfade if it is no longer next in the queue."""
+        mixer = self._source
+        if isinstance(mixer, CrossfadeSource) and mixer.next_tag is not None:
+            if not self.queue.queue or self.queue.queue[0] is not mixer.next_tag:
+                mixer.cancel_next()
+
+    async def _handle_next_prepared(self, song):
+        # Entregar el pipe preabierto al mezclador para que haga el crossfade
+        mixer = self._source
+        if not isinstance(mixer, CrossfadeSource) or mixer.next_tag is not None:
+            return
+        if not self.queue.queue or self.queue.queue[0] is not song:
+            return
+        source = self.prefetcher.take_prepared(song)
+        if source:
+            mixer.queue_next(source, song.duration, tag=song)
+
+    async def _handle_track_advanced(self, mixer, song):
+        # El mezclador ya está sonando la siguiente canción
+        if mixer is not self._source:
+            return
+        if self.queue.queue and self.queue.queue[0] is song:
+            self.queue.get_next()
+        metrics.inc('fzmusic_track_transitions_total', help_text='Songs that ended and gave way to the next one')
+        self.queue.current = song
+        self.queue.update_activity()
+        self.prefetcher.track_started(song, self.queue.volume)
+        YTDLSource.cache_song(song.video_id, song.stream_url, song.duration)
+        await self.send(embed=EmbedCreator.create_now_playing_embed(song), key='now_playing')
+
+    async def _handle_enqueue(self, songs, channel=None):
+        """Add songs to the queue. Returns True if playback started with them."""
+        if channel is not None:
+            self.channel = channel
+        for song in songs:
+            self.queue.add(song)
+        self.queue.update_activity()
+        self.prefetcher.notify()
+
+        voice_client = self.voice_client
+        if self._source is None and voice_client and not voice_client.is_playing():
+            self._requested_at = time.perf_counter()
+            await self._play_next()
+            return True
+        return False
+
+    async def _handle_track_finished(self, source, ended_at=None):
+        # Ignorar avisos de canciones que ya no son la actual (stop, skip...)
+        if source is not self._source:
+            return
+        self._source = None
+        self._ended_at = ended_at
+        metrics.inc('fzmusic_track_transitions_total', help_text='Songs that ended and gave way to the next one')
+        await self._play_next()
+
+    async def _handle_skip(self):
+        """Skip the current song. Returns the skipped song."""
+        voice_client = self.voice_client
+        if not voice_client or not (voice_client.is_playing() or voice_client.is_paused()):
+            return None
+        song = self.queue.current
+        # El aviso de fin de canción reproducirá la siguiente
+        voice_client.stop()
+        return song
+
+    async def _handle_stop(self):
+        """Stop playback and clear the queue."""
+        self.queue.clear()
+        self.queue.current = None
+        self._source = None
+        self.prefetcher.notify()
+        voice_client = self.voice_client
+        if voice_client:
+            voice_client.stop()
+
+    async def _handle_remove(self, index):
+        """Remove the song at `index` from the queue."""
+        song = self.queue.remove(index)
+        self._check_crossfade()
+        self.prefetcher.notify()
+        return song
+
+    async def _handle_clear(self):
+        """Clear the queue, keeping the current song."""
+        self.queue.clear()
+        self._check_crossfade()
+        self.prefetcher.notify()
+
+    async def _handle_seek(self, position):
+        """Restart the current song at `position` seconds. Returns False if nothing is playing."""
+        voice_client = self.voice_client
+        song = self.queue.current
+        if not song or self._source is None or not voice_client or not (voice_client.is_playing() or voice_client.is_paused()):
+            return False
+
+        # Reutiliza la URL de stream ya resuelta (o el fichero en caché), sin volver a extraer
+        source = await self._create_source(song, start=position)
+        if source is None:
+            return False
+
+        voice_client = self.voice_client
+        if not voice_client or not voice_client.is_connected() or self.queue.current is not song:
+            source.cleanup()
+            return False
+
+        paused = voice_client.is_paused()
+        # El aviso de fin del source anterior se ignora porque ya no es el actual
+        self._source = None
+        voice_client.stop()
+        self._start(voice_client, song, source, start=position)
+        if paused:
+            voice_client.pause()
+        return True
+
+    async def _handle_pause(self):
+        voice_client = self.voice_client
+        if not voice_client or not voice_client.is_playing():
+            return False
+        voice_client.pause()
+        return True
+
+    async def _handle_resume(self):
+        voice_client = self.voice_client
+        if not voice_client or not voice_client.is_paused():
+            return False
+        voice_client.resume()
+        return True
+
+    async def _handle_volume(self, volume):
+        """Set the volume (0.0-1.0). Returns True if it also applied to the current song."""
+        self.queue.volume = volume
+        # El pipe preabierto lleva el volumen anterior en su filtro de ffmpeg
+        self.prefetcher.discard_prepared()
+        if self._source is not None and self._source.live_volume:
+            self._source.volume = volume
+            return True
+        return False
+
+    async def _handle_disconnect(self):
+        """Clear everything and leave the voice channel."""
+        # Cerrar antes de esperar a la desconexión, para que los comandos nuevos
+        # no entren en este inbox (submit los responde con None)
+        self.closed = True
+        self.queue.clear()
+        self.queue.current = None
+        self._source = None
+        voice_client = self.voice_client
+        if voice_client:
+            await voice_client.disconnect()
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from .youtube_dl import YTDLSource, audio_cache
+from ..config.settings import PREFETCH_DEPTH, PREOPEN_SECONDS, AUDIO_ENGINE
+
+logger = logging.getLogger('prefetcher')
+
+class Prefetcher:
+    """Background resolver that warms the next songs of a guild's queue."""
+    def __init__(self, bot, guild_id, queue, depth=PREFETCH_DEPTH, preopen_seconds=PREOPEN_SECONDS,
+                 engine=AUDIO_ENGINE, on_prepared=None):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.queue = queue
+        self.depth = depth
+        self.preopen_seconds = preopen_seconds
+        self.engine = engine
+        self.on_prepared = on_prepared  # Called with the song once its pipe is open
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._preopen_task = None
+        self._prepared = None  # Song whose ffmpeg pipe is already open
+
+    def start(self):
+        """Start the background resolver task."""
+        if self._task is None or self._task.done():
+            self._task = self.bot.loop.create_task(self._run())
+
+    def stop(self):
+        """Stop the background tasks and release any pre-opened source."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._preopen_task:
+            self._preopen_task.cancel()
+            self._preopen_task = None
+        self._release_prepared()
+
+    def notify(self):
+        """Wake up the resolver after the queue changed."""
+        self.start()
+        self._wakeup.set()
+
+    def track_started(self, song, volume, elapsed=0):
+        """Schedule opening the next song's ffmpeg pipe shortly before `song` ends.
+
+        `elapsed` is the position `song` starts playing from, e.g. after a seek.
+        """
+        if self._preopen_task:
+            self._preopen_task.cancel()
+            self._preopen_task = None
+
+        if self.preopen_seconds > 0 and song.duration:
+            delay = max(0, song.duration - elapsed - self.preopen_seconds)
+            self._preopen_task = self.bot.loop.create_task(self._preopen_next(delay, volume))
+
+        self.notify()
+
+    def take_prepared(self, song):
+        """Return the pre-opened source for `song`, if there is one."""
+        if self._prepared is not song:
+            return None
+        source = song.prepared_source
+        song.prepared_source = None
+        self._prepared = None
+        return source
+
+    def discard_prepared(self):
+        """Close the pre-opened source, e.g. because it was opened with an old volume."""
+        self._release_prepared()
+
+    def _release_prepared(self):
+        if self._prepared is not None:
+            if self._prepared.prepared_source:
+                self._prepared.prepared_source.cleanup()
+                self._prepared.prepared_source = None
+            self._prepared = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Liberar el pipe abierto si la canción ya no es la siguiente (skip, remove, clear...)
+            if self._prepared is not None and (not self.queue.queue or self.queue.queue[0] is not self._prepared):
+                self._release_prepared()
+
+            for song in list(self.queue.queue[:self.depth]):
+                # Las canciones en la caché local no necesitan URL de stream
+                if song.video_id in audio_cache or not YTDLSource.is_stream_stale(song.stream_url):
+                    continue
+                try:
+                    stream_url = await YTDLSource.refresh_stream_url(song.url, loop=self.bot.loop, guild_id=self.guild_id)
+                    if stream_url:
+                        song.stream_url = stream_url
+                except Exception as e:
+                    logger.error(f"Error prefetching {song.title}: {e}")
+
+    async def _preopen_next(self, delay, volume):
+        try:
+            await asyncio.sleep(delay)
+            if not self.queue.queue:
+                return
+            song = self.queue.queue[0]
+            if self._prepared is song:
+                return
+            self._release_prepared()
+
+            source = YTDLSource.create_cached_source(song.video_id, volume=volume, engine=self.engine)
+            if source:
+                song.prepared_source = source
+                self._prepared = song
+                if self.on_prepared:
+                    self.on_prepared(song)
+                return
+
+            if YTDLSource.is_stream_stale(song.stream_url):
+                stream_url = await YTDLSource.refresh_stream_url(song.url, loop=self.bot.loop, guild_id=self.guild_id)
+                if not stream_url:
+                    return
+                song.stream_url = stream_url
+
+            # La canción pudo cambiar mientras resolvíamos el stream
+            if not self.queue.queue or self.queue.queue[0] is not song:
+                return
+            song.prepared_source = YTDLSource.create_source(song.stream_url, volume=volume, engine=self.engine)
+            self._prepared = song
+            if self.on_prepared:
+                self.on_prepared(song)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error pre-opening next song: {e}")
+        finally:
+            if self._preopen_task is asyncio.current_task():
+                self._preopen_task = None
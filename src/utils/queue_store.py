@@ -0,0 +1,87 @@
+import json
+import logging
+import sqlite3
+import time
+import weakref
+from .batched_db import BatchedDatabase
+
+logger = logging.getLogger('queue_store')
+
+class QueueStore:
+    """SQLite (WAL) snapshots of the guild queues, so they survive restarts.
+
+    Changed queues are only marked dirty; a background task writes all of
+    them in a single transaction every `flush_interval` seconds. The songs
+    are serialised in the executor, and only when they changed since the
+    last write. Queues are read back one guild at a time, the first time the
+    guild is used. With no `db_path` the store is disabled and every method
+    is a no-op.
+    """
+    def __init__(self, db_path=None, flush_interval=2.0):
+        self._db = None
+        self._dirty = {}  # guild_id -> MusicQueue
+        # MusicQueue -> (songs_version, JSON of the songs last written); the entry goes away with the queue
+        self._songs_json = weakref.WeakKeyDictionary()
+
+        if db_path:
+            try:
+                self._db = BatchedDatabase(db_path, (
+                    'CREATE TABLE IF NOT EXISTS queues ('
+                    'guild_id INTEGER PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)',
+                ), self._collect, self._write, flush_interval=flush_interval)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open queue database {db_path}: {e}")
+                self._db = None
+
+    @property
+    def enabled(self):
+        return self._db is not None
+
+    def load(self, guild_id):
+        """Return the saved state of a guild's queue, or None."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.reader.execute('SELECT state FROM queues WHERE guild_id = ?', (guild_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error loading the queue of guild {guild_id}: {e}")
+            return None
+
+    def mark_dirty(self, queue):
+        """Schedule saving `queue` with the next batch."""
+        if self._db is None:
+            return
+        self._dirty[queue.guild_id] = queue
+        self._db.schedule()
+
+    def _collect(self):
+        # La instantánea se toma en el event loop, mientras la cola no puede cambiar;
+        # las canciones solo se copian si cambiaron desde la última escritura
+        rows = []
+        for guild_id, queue in self._dirty.items():
+            written = self._songs_json.get(queue)
+            songs_json = written[1] if written and written[0] == queue.songs_version else None
+            state = queue.snapshot(include_songs=songs_json is None)
+            rows.append((guild_id, queue, queue.songs_version, state, songs_json))
+        self._dirty.clear()
+        return rows
+
+    def _write(self, db, rows):
+        now = time.time()
+        for guild_id, queue, songs_version, state, songs_json in rows:
+            if state is None:
+                self._songs_json.pop(queue, None)
+                db.execute('DELETE FROM queues WHERE guild_id = ?', (guild_id,))
+                continue
+            if songs_json is None:
+                songs_json = json.dumps([song.to_record() for song in state.pop('songs')])
+                self._songs_json[queue] = (songs_version, songs_json)
+            # Las canciones ya serializadas se insertan tal cual en el JSON del estado
+            state_json = f'{json.dumps(state)[:-1]}, "songs": {songs_json}}}'
+            db.execute('INSERT OR REPLACE INTO queues VALUES (?, ?, ?)', (guild_id, state_json, now))
+
+    def flush(self):
+        """Write every pending change right away (e.g. on shutdown)."""
+        if self._db is not None:
+            self._db.flush()
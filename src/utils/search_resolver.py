@@ -0,0 +1,51 @@
+import logging
+import time
+from collections import OrderedDict
+from .single_flight import SingleFlight
+
+logger = logging.getLogger('search_resolver')
+
+def normalize_query(query):
+    """Lowercase a search query and collapse its whitespace."""
+    return ' '.join(query.lower().split())
+
+class SearchResolver:
+    """Resolves search terms to YouTube video IDs.
+
+    Results are cached by normalised query for `ttl` seconds, and identical
+    searches running at the same time (from any guild) share one extraction.
+    """
+    def __init__(self, max_entries=1024, ttl=21600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # normalised query -> (resolved_at, video_id)
+        self._in_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def resolve(self, query, search):
+        """Return the video ID for `query`, or None if nothing was found.
+
+        `search(query)` is the coroutine that runs the actual extraction.
+        """
+        key = normalize_query(query)
+        if not key:
+            return None
+
+        record = self._entries.get(key)
+        if record is not None and time.time() - record[0] <= self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return record[1]
+        self.misses += 1
+
+        video_id = await self._in_flight.run(key, lambda: search(key))
+        if video_id:
+            self._entries[key] = (time.time(), video_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return video_id
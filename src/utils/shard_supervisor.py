@@ -0,0 +1,104 @@
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import urllib.request
+
+logger = logging.getLogger('shard_supervisor')
+
+def fetch_recommended_shards(token):
+    """Ask Discord how many shards the bot should use."""
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {token}', 'User-Agent': 'FzMusic'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)['shards']
+
+def split_shards(shard_count, processes):
+    """Split shard IDs 0..shard_count-1 into contiguous ranges, one per process."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+class ShardSupervisor:
+    """Runs each shard range in its own process and restarts the ones that crash.
+
+    `target(shard_ids, shard_count, index)` must be a picklable module-level
+    function that runs a bot for those shards until it stops; `index` is the
+    worker's position (0..processes-1) and stays the same across restarts.
+    """
+    def __init__(self, target, shard_count, processes, restart_delay=5, max_restart_delay=300):
+        self.target = target
+        self.shard_count = shard_count
+        self.shard_ranges = split_shards(shard_count, processes)
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = {}  # index -> (process, started_at, current delay)
+        self._stopping = False
+
+    def _start(self, index, delay):
+        shard_ids = self.shard_ranges[index]
+        process = self._context.Process(
+            target=self.target,
+            args=(shard_ids, self.shard_count, index),
+            name=f'shards-{shard_ids[0]}-{shard_ids[-1]}',
+        )
+        # El hijo (spawn) hereda el entorno: así la configuración sabe qué worker es
+        os.environ['SHARD_WORKER_INDEX'] = str(index)
+        process.start()
+        logger.info(f"Started {process.name} (pid {process.pid})")
+        self._workers[index] = (process, time.monotonic(), delay)
+
+    def stop(self, *_):
+        """Terminate every worker process."""
+        self._stopping = True
+        for process, _, _ in self._workers.values():
+            if process.is_alive():
+                process.terminate()
+
+    def run(self):
+        """Start all workers and keep them alive until interrupted."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for index in range(len(self.shard_ranges)):
+            # Una señal durante el arranque escalonado no debe lanzar los workers restantes
+            if self._stopping:
+                break
+            self._start(index, self.restart_delay)
+            if self._stopping or index == len(self.shard_ranges) - 1:
+                continue
+            # Discord limita los IDENTIFY, así que escalonamos los arranques
+            time.sleep(self.restart_delay)
+
+        restart_at = {}  # index -> time when a crashed worker may restart
+        while not self._stopping:
+            time.sleep(1)
+            now = time.monotonic()
+            for index, (process, started_at, delay) in list(self._workers.items()):
+                if process.is_alive() or self._stopping:
+                    continue
+
+                if index not in restart_at:
+                    # Si el proceso aguantó un rato, el fallo no es un bucle de caídas
+                    if now - started_at > self.max_restart_delay:
+                        delay = self.restart_delay
+                    logger.error(f"{process.name} exited with code {process.exitcode}, restarting in {delay}s")
+                    restart_at[index] = now + delay
+                    self._workers[index] = (process, started_at, delay)
+                elif now >= restart_at[index]:
+                    del restart_at[index]
+                    self._start(index, min(delay * 2, self.max_restart_delay))
+
+        for process, _, _ in self._workers.values():
+            process.join(timeout=10)
@@ -0,0 +1,53 @@
+import asyncio
+
+class SingleFlight:
+    """Shares one running call between concurrent callers with the same key.
+
+    The first caller of `run(key, func)` starts `func()` as a task; callers
+    arriving while it runs await the same result instead of starting their
+    own. If every caller is cancelled before it finishes, the shared task is
+    cancelled too (an extraction still waiting in the scheduler is dropped).
+    """
+    def __init__(self):
+        self._calls = {}  # key -> [task, number of callers waiting]
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    def stats(self):
+        """Calls started, calls that joined one already running, and calls in flight."""
+        return {
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls),
+        }
+
+    async def run(self, key, func):
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(func())
+            call = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        task = call[0]
+        call[1] += 1
+        try:
+            # shield: cancelar a uno de los que esperan no cancela la llamada compartida
+            return await asyncio.shield(task)
+        finally:
+            call[1] -= 1
+            if not call[1] and not task.done():
+                # Ya no queda nadie esperando el resultado. Se olvida ya, sin esperar
+                # al callback, para que un nuevo caller no reciba esta cancelación
+                task.cancel()
+                self._forget(key, task)
+
+    def _forget(self, key, task):
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
@@ -1,8 +1,25 @@
 import asyncio
 import re
+import threading
+import time
 import yt_dlp
 import discord
 import logging
+from urllib.parse import urlparse, parse_qs
+from .extraction_cache import ExtractionCache, extract_video_id, extract_playlist_id
+from .ytdl_pool import YTDLPool
+from .extraction_scheduler import ExtractionScheduler
+from .audio_sources import NumpyVolumeSource
+from .audio_cache import AudioCache, OggFileAudio
+from .search_resolver import SearchResolver
+from .single_flight import SingleFlight
+from .metrics import metrics
+from ..config.settings import (
+    EXTRACTION_CACHE_SIZE, EXTRACTION_CACHE_TTL, EXTRACTION_CACHE_DB, YTDL_POOL_SIZE,
+    EXTRACTION_WORKERS, EXTRACTION_GUILD_LIMIT, EXTRACTION_USE_PROCESSES, PLAYLIST_BATCH_SIZE,
+    AUDIO_ENGINE, OPUS_BITRATE, AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB, FFMPEG_PATH,
+    SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL,
+)
 
 logger = logging.getLogger('youtube_dl')
 
@@ -22,12 +39,120 @@ ytdl_format_options = {
     'extract_flat': 'in_playlist',
 }
 
+# Options used to list the videos of a playlist without resolving them
+ytdl_playlist_options = {
+    'extract_flat': True,
+    'quiet': True,
+    'no_warnings': True,
+    'ignoreerrors': True,
+}
+
 ffmpeg_options = {
     'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
     'options': '-vn',
 }
 
-ytdl = yt_dlp.YoutubeDL(ytdl_format_options)
+# Seconds before a signed stream URL expires at which we consider it stale
+STREAM_EXPIRY_MARGIN = 60
+
+# Redirect results (youtu.be share links, regional redirects...) followed when streaming a playlist
+MAX_PLAYLIST_REDIRECTS = 3
+
+# Pre-warmed YoutubeDL instances, reused across extractions
+ytdl_pool = YTDLPool({
+    'track': ytdl_format_options,
+    'search': {**ytdl_format_options, 'default_search': 'ytsearch1', 'extract_flat': True},
+    'playlist': ytdl_playlist_options,
+}, size=YTDL_POOL_SIZE)
+
+# Dedicated executor for extraction, shared fairly between guilds
+extraction_scheduler = ExtractionScheduler(
+    workers=EXTRACTION_WORKERS,
+    per_guild_limit=EXTRACTION_GUILD_LIMIT,
+    use_processes=EXTRACTION_USE_PROCESSES,
+)
+
+# Shared across guilds, so a popular URL is only extracted once
+extraction_cache = ExtractionCache(
+    max_entries=EXTRACTION_CACHE_SIZE,
+    metadata_ttl=EXTRACTION_CACHE_TTL,
+    db_path=EXTRACTION_CACHE_DB,
+)
+
+# Songs played before, stored locally so hot tracks skip the network
+audio_cache = AudioCache(
+    directory=AUDIO_CACHE_DIR,
+    max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024,
+    ffmpeg=FFMPEG_PATH,
+    bitrate=OPUS_BITRATE,
+)
+
+# Extractions in progress, shared by callers asking for the same video or playlist
+extraction_flight = SingleFlight()
+
+# Search terms -> video IDs, shared across guilds
+search_resolver = SearchResolver(max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+metrics.register('fzmusic_extraction_queue_depth', lambda: extraction_scheduler.queue_depth,
+                 help_text='Extraction jobs waiting for a worker')
+metrics.register('fzmusic_extractions_running', lambda: extraction_scheduler.stats()['running'],
+                 help_text='Extraction jobs running')
+metrics.register('fzmusic_extraction_cache_hits_total', lambda: extraction_cache.hits, 'counter',
+                 help_text='Extraction cache hits')
+metrics.register('fzmusic_extraction_cache_misses_total', lambda: extraction_cache.misses, 'counter',
+                 help_text='Extraction cache misses')
+metrics.register('fzmusic_extractions_coalesced_total', lambda: extraction_flight.coalesced, 'counter',
+                 help_text='Extractions that joined an identical one already running')
+metrics.register('fzmusic_search_cache_hits_total', lambda: search_resolver.hits, 'counter',
+                 help_text='Searches answered from the search cache')
+metrics.register('fzmusic_search_cache_misses_total', lambda: search_resolver.misses, 'counter',
+                 help_text='Searches that needed an extraction')
+metrics.register('fzmusic_audio_cache_hits_total', lambda: audio_cache.hits, 'counter',
+                 help_text='Songs played from the local audio cache')
+metrics.register('fzmusic_audio_cache_misses_total', lambda: audio_cache.misses, 'counter',
+                 help_text='Songs not found in the local audio cache')
+metrics.register('fzmusic_audio_cache_hit_ratio', lambda: audio_cache.stats()['hit_rate'],
+                 help_text='Share of played songs found in the local audio cache')
+metrics.register('fzmusic_audio_cache_bytes_saved_total', lambda: audio_cache.bytes_saved, 'counter',
+                 help_text='Bytes of audio played from the local audio cache instead of the network')
+metrics.register('fzmusic_audio_cache_fills_total', lambda: audio_cache.fills, 'counter',
+                 help_text='Songs stored in the local audio cache')
+metrics.register('fzmusic_audio_cache_bytes', lambda: audio_cache.size,
+                 help_text='Size of the local audio cache')
+
+def extract_info(profile, url, download=False, playlist_items=None):
+    """Run a blocking yt-dlp extraction with a pooled instance of `profile`.
+
+    Module-level so it can also run in the scheduler's process pool.
+    """
+    # playlist_items needs its own options, so it doesn't use the pool
+    if playlist_items:
+        format_options = dict(ytdl_pool.profiles[profile], playlist_items=playlist_items)
+        return yt_dlp.YoutubeDL(format_options).extract_info(url, download=download)
+    with ytdl_pool.checkout(profile) as ytdl_instance:
+        return ytdl_instance.extract_info(url, download=download)
+
+def stream_playlist_entries(url, emit, stop):
+    """Extract a playlist lazily, calling `emit(entry)` for each flat entry as it arrives.
+
+    Runs in an extraction thread; `stop` is a threading.Event that ends the
+    iteration early.
+    """
+    with ytdl_pool.checkout('playlist') as ytdl_instance:
+        # process=False keeps 'entries' as a generator that fetches pages on demand
+        data = ytdl_instance.extract_info(url, download=False, process=False)
+        # Sin procesar, yt-dlp no sigue las redirecciones ('_type': 'url'), así que se siguen aquí
+        hops = 0
+        while data and data.get('_type') in ('url', 'url_transparent') and hops < MAX_PLAYLIST_REDIRECTS:
+            data = ytdl_instance.extract_info(data['url'], download=False, process=False)
+            hops += 1
+        if not data:
+            return
+        for entry in data.get('entries') or []:
+            if stop.is_set():
+                return
+            if entry and (entry.get('url') or entry.get('id')):
+                emit(entry)
 
 class YTDLSource(discord.PCMVolumeTransformer):
     def __init__(self, source, *, data, volume=0.5):
@@ -51,66 +176,115 @@ class YTDLSource(discord.PCMVolumeTransformer):
         else:
             return f"{minutes}:{seconds:02d}"
     
-    @classmethod
-    async def from_url(cls, url, *, loop=None, stream=False, volume=0.5, playlist_items=None):
-        """Extract info and create a source for a YouTube URL or search term."""
-        loop = loop or asyncio.get_event_loop()
+    @staticmethod
+    def parse_timestamp(text):
+        """Parse 'SS', 'MM:SS' or 'H:MM:SS' into seconds. Returns None if invalid."""
+        parts = text.strip().split(':')
+        if not 1 <= len(parts) <= 3 or not all(part.isdigit() for part in parts):
+            return None
         
-        # Create a copy of ytdl_format_options to modify
-        format_options = ytdl_format_options.copy()
+        # Solo el primer campo puede pasar de 59 ('90' o '90:00' valen, '1:75' no)
+        if any(int(part) >= 60 for part in parts[1:]):
+            return None
         
-        # If playlist_items is specified, add it to the options (we'll keep this for potential future use)
-        if playlist_items:
-            format_options['playlist_items'] = playlist_items
+        seconds = 0
+        for part in parts:
+            seconds = seconds * 60 + int(part)
+        return seconds
+    
+    @classmethod
+    async def from_url(cls, url, *, loop=None, stream=False, volume=0.5, playlist_items=None, guild_id=None):
+        """Extract info (metadata and stream URL) for a YouTube URL or search term."""
+        loop = loop or asyncio.get_event_loop()
         
-        # For search terms, force selecting only the first result
+        # Las búsquedas se resuelven primero a un vídeo concreto (con caché propia)
         if url.startswith('ytsearch:'):
-            format_options['default_search'] = 'ytsearch1'
+            video_id = await cls.search(url[len('ytsearch:'):], guild_id=guild_id)
+            if not video_id:
+                return []
+            url = f"https://www.youtube.com/watch?v={video_id}"
         
-        # Create a new YoutubeDL instance with the modified options
-        ytdl_instance = yt_dlp.YoutubeDL(format_options)
+        # Single videos are served from the extraction cache when possible
+        video_id = None
+        if not playlist_items and not cls.is_playlist(url):
+            video_id = extract_video_id(url)
+        if video_id:
+            cached = extraction_cache.get(video_id, need_stream=stream)
+            if cached:
+                source = cls.process_entry(cached, stream, volume)
+                return [source] if source else []
+        
+        # Llamadas simultáneas para el mismo vídeo o playlist comparten una sola extracción
+        if video_id:
+            key = ('video', video_id, stream)
+        else:
+            key = ('url', extract_playlist_id(url) or url, playlist_items, stream)
         
         try:
-            # Run the extraction in a separate thread to avoid blocking
-            data = await loop.run_in_executor(None, lambda: ytdl_instance.extract_info(url, download=not stream))
-            
+            with metrics.timer('fzmusic_from_url_seconds', 'Time to extract a song in from_url'):
+                data = await extraction_flight.run(key, lambda: cls._extract(url, stream, playlist_items, guild_id))
             if data is None:
-                logger.error(f"Failed to extract info from {url}")
                 return []
             
-            if 'entries' in data:
-                # Take only the first entry from playlist/search results
-                entries = [entry for entry in data['entries'] if entry is not None]
-                if not entries:
-                    return []
-                # Just take the first result for search queries
-                data = entries[0]
-            
-            # Create the audio source
+            # Keep only the metadata; the audio source is created when the song plays
             source = cls.process_entry(data, stream, volume)
             return [source] if source else []
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error in YTDLSource.from_url: {e}")
             return []
+    
+    @classmethod
+    async def _extract(cls, url, stream, playlist_items, guild_id):
+        """Run the extraction for `from_url` and cache its result. Returns the info dict or None."""
+        # Run the extraction on the dedicated scheduler to avoid blocking
+        data = await extraction_scheduler.run(guild_id, extract_info, 'track', url, not stream, playlist_items)
+        
+        if data is None:
+            logger.error(f"Failed to extract info from {url}")
+            return None
+        
+        if 'entries' in data:
+            # Take only the first entry from playlist/search results
+            entries = [entry for entry in data['entries'] if entry is not None]
+            if not entries:
+                return None
+            # Just take the first result for search queries
+            data = entries[0]
+        
+        if stream and data.get('url'):
+            # Guardar la URL solo mientras no se considere caducada
+            expiry = cls.stream_expiry(data['url'])
+            extraction_cache.put(data, stream_expires=expiry - STREAM_EXPIRY_MARGIN if expiry else None)
+        return data
         
+    @staticmethod
+    async def search(query, *, guild_id=None):
+        """Resolve a search term to the video ID of its first result, or None."""
+        async def run_search(normalized):
+            data = await extraction_scheduler.run(guild_id, extract_info, 'search', f"ytsearch1:{normalized}")
+            entries = [entry for entry in (data or {}).get('entries') or [] if entry and entry.get('id')]
+            return entries[0]['id'] if entries else None
+        
+        try:
+            return await search_resolver.resolve(query, run_search)
+        except Exception as e:
+            logger.error(f"Error searching for {query}: {e}")
+            return None
+    
     @staticmethod
     def process_entry(entry, stream=False, volume=0.5):
-        """Process a single entry from ytdl extraction."""
+        """Process a single entry from ytdl extraction.
+
+        Only the extracted metadata is kept; the ffmpeg pipeline is opened later
+        with `create_source` when the song is about to play.
+        """
         try:
-            # For streamed sources, we need to get the direct URL
+            # For streamed sources, we only need the direct URL
             if stream:
-                url = entry['url']
-                ffmpeg_options = {
-                    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-                    'options': '-vn'
-                }
-                source = discord.FFmpegPCMAudio(url, **ffmpeg_options)
-                
-                # Apply volume transformation
-                transformed_source = discord.PCMVolumeTransformer(source, volume=volume)
-                
                 return {
-                    'source': transformed_source,
+                    'stream_url': entry['url'],
                     'data': entry
                 }
             else:
@@ -119,7 +293,105 @@ class YTDLSource(discord.PCMVolumeTransformer):
         except Exception as e:
             logger.error(f"Error processing entry: {e}")
             return None
-    
+
+    @classmethod
+    def create_source(cls, stream_url, volume=0.5, engine=AUDIO_ENGINE, start=0):
+        """Open the ffmpeg pipeline for a stream URL.
+
+        With the 'opus' engine ffmpeg outputs Opus packets directly (copying the
+        stream when it is already Opus at full volume) and applies the volume in
+        its filter graph, so nothing is decoded or encoded in Python. The 'pcm'
+        engine decodes to PCM and scales it with a NumpyVolumeSource, which
+        allows changing the volume while playing. `start` (seconds) seeks on
+        the input side, before ffmpeg opens the stream.
+        """
+        before_options = ffmpeg_options['before_options']
+        if start:
+            before_options = f"{before_options} -ss {start:.2f}"
+        
+        if engine == 'pcm':
+            source = discord.FFmpegPCMAudio(stream_url, before_options=before_options, options=ffmpeg_options['options'])
+            return NumpyVolumeSource(source, volume=volume)
+        
+        if volume == 1.0 and cls.stream_is_opus(stream_url):
+            return discord.FFmpegOpusAudio(stream_url, codec='copy', before_options=before_options,
+                                           options=ffmpeg_options['options'])
+        
+        options = f"{ffmpeg_options['options']} -filter:a volume={volume:.2f}"
+        return discord.FFmpegOpusAudio(
+            stream_url,
+            bitrate=OPUS_BITRATE,
+            before_options=before_options,
+            options=options
+        )
+
+    @classmethod
+    def create_cached_source(cls, video_id, volume=0.5, engine=AUDIO_ENGINE, start=0):
+        """Open a song from the local audio cache. Returns None if it isn't cached."""
+        path = audio_cache.lookup(video_id)
+        if not path:
+            return None
+        
+        before_options = f"-ss {start:.2f}" if start else None
+        if engine == 'pcm':
+            source = discord.FFmpegPCMAudio(path, before_options=before_options, options='-vn')
+            return NumpyVolumeSource(source, volume=volume)
+        
+        if volume == 1.0:
+            # El fichero ya es Opus: se lee directamente, sin ffmpeg
+            return OggFileAudio(path, start=start)
+        
+        return discord.FFmpegOpusAudio(path, bitrate=OPUS_BITRATE, before_options=before_options,
+                                       options=f"-vn -filter:a volume={volume:.2f}")
+
+    @classmethod
+    def cache_song(cls, video_id, stream_url, duration=None):
+        """Count a song that started playing and store it in the local audio cache in the background, if enabled."""
+        audio_cache.record_play(video_id)
+        audio_cache.schedule_fill(video_id, stream_url, duration, copy=cls.stream_is_opus(stream_url))
+
+    @staticmethod
+    def stream_is_opus(stream_url):
+        """Check if a YouTube stream URL points to an Opus (audio/webm) format."""
+        mime = parse_qs(urlparse(stream_url).query).get('mime', [''])[0]
+        return mime == 'audio/webm'
+
+    @staticmethod
+    def stream_expiry(stream_url):
+        """Return the expiry timestamp of a signed stream URL, or None if unknown."""
+        if not stream_url:
+            return None
+        # Las URLs firmadas de googlevideo llevan la caducidad en el parámetro 'expire'
+        # (como query string o como segmento /expire/<ts>/ del path)
+        query = parse_qs(urlparse(stream_url).query)
+        if 'expire' in query:
+            value = query['expire'][0]
+        else:
+            match = re.search(r'/expire/(\d+)', stream_url)
+            value = match.group(1) if match else None
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
+
+    @classmethod
+    def is_stream_stale(cls, stream_url, margin=STREAM_EXPIRY_MARGIN):
+        """Check if a stream URL is missing or about to expire."""
+        if not stream_url:
+            return True
+        expiry = cls.stream_expiry(stream_url)
+        if expiry is None:
+            return False
+        return expiry - margin <= time.time()
+
+    @classmethod
+    async def refresh_stream_url(cls, url, *, loop=None, guild_id=None):
+        """Re-resolve the direct stream URL for a song's webpage URL."""
+        sources = await cls.from_url(url, loop=loop, stream=True, guild_id=guild_id)
+        if not sources:
+            return None
+        return sources[0]['stream_url']
+
     @staticmethod
     def is_playlist(url):
         """Check if the URL is a playlist."""
@@ -135,23 +407,73 @@ class YTDLSource(discord.PCMVolumeTransformer):
         return False
 
     @staticmethod
-    async def extract_playlist_urls(url, *, loop=None):
+    def entry_url(entry):
+        """Return the webpage URL of a flat playlist entry."""
+        url = entry.get('url')
+        if url and url.startswith(('http://', 'https://')):
+            return url
+        return f"https://www.youtube.com/watch?v={entry['id']}"
+
+    @staticmethod
+    async def iter_playlist(url, *, guild_id=None, batch_size=PLAYLIST_BATCH_SIZE):
+        """Yield the flat entries of a playlist in batches as they are extracted.
+
+        The first entry is yielded on its own so playback can start right away.
+        """
+        if extraction_scheduler.use_processes:
+            # Callbacks can't cross process boundaries, so extract the whole list at once
+            data = await extraction_scheduler.run(guild_id, extract_info, 'playlist', url)
+            entries = [entry for entry in (data or {}).get('entries') or []
+                       if entry and (entry.get('url') or entry.get('id'))]
+            for start in range(0, len(entries), batch_size):
+                yield entries[start:start + batch_size]
+            return
+
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue()
+        stop = threading.Event()
+        finished = object()
+
+        def emit(entry):
+            loop.call_soon_threadsafe(pending.put_nowait, entry)
+
+        def job_done(job):
+            pending.put_nowait(finished)
+            # Leer la excepción siempre, también si el consumidor ya dejó de iterar
+            if not job.cancelled() and job.exception() is not None:
+                logger.error(f"Error streaming playlist {url}: {job.exception()}")
+
+        job = asyncio.ensure_future(extraction_scheduler.run(guild_id, stream_playlist_entries, url, emit, stop))
+        job.add_done_callback(job_done)
+
+        try:
+            batch = []
+            first = True
+            while True:
+                entry = await pending.get()
+                if entry is finished:
+                    break
+                batch.append(entry)
+                # Entregar el lote cuando se llena o cuando no hay más entradas disponibles por ahora
+                if first or len(batch) >= batch_size or pending.empty():
+                    yield batch
+                    batch = []
+                    first = False
+            if batch:
+                yield batch
+        finally:
+            stop.set()
+
+    @staticmethod
+    async def extract_playlist_urls(url, *, loop=None, guild_id=None):
         """Extract individual video URLs from a playlist."""
         loop = loop or asyncio.get_event_loop()
         
-        # Use a simpler format to just get video URLs and not actual audio
-        format_options = {
-            'extract_flat': True,
-            'quiet': True,
-            'no_warnings': True,
-            'ignoreerrors': True,
-        }
-        
-        ytdl_instance = yt_dlp.YoutubeDL(format_options)
-        
         try:
-            # Este es el método correcto para ejecutar código bloqueante en un loop
-            data = await loop.run_in_executor(None, lambda: ytdl_instance.extract_info(url, download=False))
+            # Use a simpler format to just get video URLs and not actual audio
+            key = ('playlist_urls', extract_playlist_id(url) or url)
+            with metrics.timer('fzmusic_playlist_extraction_seconds', 'Time to list the videos of a playlist'):
+                data = await extraction_flight.run(key, lambda: extraction_scheduler.run(guild_id, extract_info, 'playlist', url))
             
             # Extract individual video URLs from the playlist
             if 'entries' in data:
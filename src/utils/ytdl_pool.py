@@ -0,0 +1,59 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+import yt_dlp
+
+logger = logging.getLogger('ytdl_pool')
+
+class YTDLPool:
+    """Bounded pool of reusable YoutubeDL instances, one sub-pool per option profile.
+
+    Building a YoutubeDL sets up its extractors, cookie jar and HTTP session,
+    so instances are created once and checked out for each extraction. Reusing
+    an instance also reuses its open connections.
+    """
+    def __init__(self, profiles, size=4, prewarm=True):
+        self.profiles = profiles
+        self.size = size
+        self._idle = {name: queue.LifoQueue() for name in profiles}
+        self._created = {name: 0 for name in profiles}
+        self._lock = threading.Lock()
+
+        if prewarm:
+            for name in profiles:
+                self._idle[name].put(self._create(name))
+
+    def _create(self, profile):
+        with self._lock:
+            self._created[profile] += 1
+        return yt_dlp.YoutubeDL(self.profiles[profile])
+
+    @contextmanager
+    def checkout(self, profile):
+        """Borrow an instance for `profile`, blocking while all of them are busy.
+
+        Meant to be used from the executor threads that run the extraction.
+        """
+        idle = self._idle[profile]
+        try:
+            instance = idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created[profile] < self.size
+                if can_create:
+                    self._created[profile] += 1
+            if can_create:
+                try:
+                    instance = yt_dlp.YoutubeDL(self.profiles[profile])
+                except Exception:
+                    with self._lock:
+                        self._created[profile] -= 1
+                    raise
+            else:
+                instance = idle.get()
+
+        try:
+            yield instance
+        finally:
+            idle.put(instance)